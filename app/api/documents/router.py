@@ -2,14 +2,15 @@ from fastapi import APIRouter, Depends, UploadFile, File, HTTPException, status
 from sqlalchemy.orm import Session
 from uuid import UUID
 from typing import List
-import hashlib
+from app.core.config import settings
 from app.models.job import Job
 from app.repositories.job_repository import JobRepository
 
 from app.core.database import get_db
 from app.core.dependencies import get_current_user, get_current_project
 from app.services.document_service import DocumentService
-from app.storage.local import LocalDiskStorage
+from app.storage.base import StagedFile, Storage
+from app.storage.factory import get_storage
 from app.schemas.document import DocumentResponse, DocumentVersionResponse
 from app.models.user import User
 
@@ -19,6 +20,13 @@ router = APIRouter(
     tags=["documents"]
 )
 
+def stage_upload(file: UploadFile, storage: Storage) -> StagedFile:
+    """
+    Streams the upload to a staging file in fixed-size blocks, hashing as it goes,
+    so only one block of it is ever held in memory.
+    """
+    return storage.stage(iter(lambda: file.file.read(settings.UPLOAD_BLOCK_SIZE), b""))
+
 # 1. UPLOAD DOCUMENT
 @router.post("", status_code=status.HTTP_201_CREATED)
 def upload_document(
@@ -32,15 +40,27 @@ def upload_document(
     """
     Async Upload document and save file ,create metadata and create version.
     """
+    storage=get_storage()
+    staged=None
     try:
-        content_bytes=file.file.read()
-        content_hash=hashlib.sha256(content_bytes).hexdigest()
+        staged=stage_upload(file, storage)
+        content_hash=staged.content_hash
+
+        #Identical bytes were uploaded before: link to that version, no write and no ingest
+        service=DocumentService(db)
+        existing=service.find_duplicate_version(project.id, content_hash)
+        if existing:
+            storage.discard_staged(staged)
+            return {
+                "document_id": existing.document_id,
+                "version_id": existing.id,
+                "job_id": None,
+                "status": "DUPLICATE"
+            }
 
-        storage=LocalDiskStorage()
         file_path=f"documents/{project.id}/{file.filename}"
-        storage.save(file_path, content_bytes)
+        file_path=storage.commit_staged(staged, file_path)
 
-        service=DocumentService(db)
         document, version=service.create_document_metadata(
             project_id=project.id,
             title=file.filename,
@@ -71,6 +91,87 @@ def upload_document(
         }
     except Exception as e:
         db.rollback()
+        if staged:
+            storage.discard_staged(staged)
+        raise HTTPException(status_code=500, detail=str(e))
+
+# 1b. BATCH UPLOAD
+@router.post("/batch", status_code=status.HTTP_201_CREATED)
+def upload_documents_batch(
+    workspace_id: UUID,
+    project_id: UUID,
+    files: List[UploadFile] = File(...),
+    project = Depends(get_current_project),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Uploads many files at once: one auth check, one transaction, and one
+    DOCUMENT_INGEST_BATCH job per INGEST_JOB_BATCH_SIZE new versions.
+    Files whose bytes already exist in the project are linked, not re-ingested.
+    """
+    storage=get_storage()
+    staged_files=[]
+    try:
+        for file in files:
+            staged_files.append((file.filename, stage_upload(file, storage)))
+
+        service=DocumentService(db)
+        existing=service.find_duplicate_versions(project.id, [staged.content_hash for _, staged in staged_files])
+
+        #(file name, status, ids) - ids of new versions are filled in once they are created
+        results=[]
+        new_files=[]
+        seen={}
+        for file_name, staged in staged_files:
+            duplicate=existing.get(staged.content_hash)
+            if duplicate:
+                results.append((file_name, "DUPLICATE", {"document_id": duplicate.document_id, "version_id": duplicate.id}))
+                storage.discard_staged(staged)
+            elif staged.content_hash in seen:
+                #Same bytes twice in one batch: only the first copy is stored and ingested
+                results.append((file_name, "DUPLICATE", seen[staged.content_hash]))
+                storage.discard_staged(staged)
+            else:
+                file_path=f"documents/{project.id}/{file_name}"
+                file_path=storage.commit_staged(staged, file_path)
+                ids={}
+                seen[staged.content_hash]=ids
+                results.append((file_name, "PROCESSING", ids))
+                new_files.append((file_name, file_path, staged.content_hash, ids))
+
+        created=service.create_documents_batch(
+            project_id=project.id,
+            created_by=current_user.id,
+            files=[(file_name, file_path, content_hash) for file_name, file_path, content_hash, _ in new_files]
+        )
+        for (_, _, _, ids), (document, version) in zip(new_files, created):
+            ids["document_id"]=document.id
+            ids["version_id"]=version.id
+
+        job_repo=JobRepository(db)
+        job_ids=[]
+        version_ids=[str(version.id) for _, version in created]
+        for start in range(0, len(version_ids), settings.INGEST_JOB_BATCH_SIZE):
+            new_job=Job(
+                project_id=project.id,
+                job_type="DOCUMENT_INGEST_BATCH",
+                target_type="PROJECT",
+                target_id=project.id,
+                payload={"version_ids": version_ids[start:start+settings.INGEST_JOB_BATCH_SIZE]}
+            )
+            job_repo.create(new_job)
+            job_ids.append(new_job.id)
+
+        db.commit()
+        return {
+            "documents": [{"file_name": file_name, "status": status_, **ids} for file_name, status_, ids in results],
+            "job_ids": job_ids
+        }
+    except Exception as e:
+        db.rollback()
+        for _, staged in staged_files:
+            storage.discard_staged(staged)
         raise HTTPException(status_code=500, detail=str(e))
 
 # 2. LIST DOCUMENTS
@@ -8,6 +8,105 @@ class Settings(BaseSettings):
 
     OPENAI_API_KEY: str | None = None
 
+    # Connection pool; the async worker holds one connection per running job
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 40
+
+    # Async worker: max concurrent jobs per job type (types not listed are not claimed)
+    WORKER_CONCURRENCY: dict[str, int] = {
+        "AI_RUN": 32,
+        "DOCUMENT_INGEST": 2,
+        "DOCUMENT_INGEST_BATCH": 1
+    }
+    # Scheduling: lower priority classes are claimed first, projects take turns within a class
+    JOB_PRIORITIES: dict[str, int] = {
+        "AI_RUN": 0,
+        "DOCUMENT_INGEST": 10,
+        "DOCUMENT_INGEST_BATCH": 20
+    }
+    # Max jobs of a type running at once for one project (types not listed are uncapped)
+    PROJECT_CONCURRENCY: dict[str, int] = {
+        "DOCUMENT_INGEST": 2,
+        "DOCUMENT_INGEST_BATCH": 1
+    }
+    # Seconds a claimed job may stay RUNNING before its worker is presumed dead and the job
+    # is put back as a failed attempt; must exceed the type's longest legitimate run
+    JOB_LEASE_SECONDS: dict[str, int] = {
+        "AI_RUN": 15 * 60,
+        "DOCUMENT_INGEST": 2 * 3600,
+        "DOCUMENT_INGEST_BATCH": 6 * 3600
+    }
+    # Idle workers are woken by job notifications; this poll is only a fallback
+    WORKER_POLL_INTERVAL: float = 30.0
+    # Where listening workers register their loopback UDP ports when not on PostgreSQL
+    JOB_NOTIFY_DIR: str = "storage_data/.job_listeners"
+
+    # Retrieval: "hashing" is a local, offline embedder; "openai" calls the embeddings API
+    EMBEDDING_BACKEND: str = "hashing"
+    EMBEDDING_DIM: int = 1024
+    EMBEDDING_MODEL: str = "text-embedding-3-small"
+    RETRIEVAL_TOP_K: int = 8
+    # Vector segments with at least this many rows get an IVF coarse quantizer
+    VECTOR_IVF_MIN_ROWS: int = 1024
+    VECTOR_NPROBE: int = 8
+    # Tiered segment merging: this many segments of similar size are merged into one
+    VECTOR_MERGE_FACTOR: int = 8
+    VECTOR_MERGE_MAX_ROWS: int = 1_000_000
+    # Same tiered merging for BM25 segments
+    LEXICAL_MERGE_FACTOR: int = 8
+    LEXICAL_MERGE_MAX_ROWS: int = 1_000_000
+    # Open segment mappings kept per index type and process (LRU)
+    INDEX_SEGMENT_CACHE_SIZE: int = 256
+    # "none" scans float32 vectors; "int8" scans quantized codes and re-scores a shortlist
+    VECTOR_QUANTIZATION: str = "none"
+    VECTOR_RESCORE_FACTOR: int = 4
+    RETRIEVAL_CANDIDATES: int = 50
+    RETRIEVAL_RERANK: bool = True
+    RETRIEVAL_RERANK_DEPTH: int = 20
+
+    # Upper bound on the packed context sent to the model, in estimated tokens
+    CONTEXT_TOKEN_BUDGET: int = 6000
+
+    # Semantic answer cache: reuse answers for near-identical questions over the same versions.
+    # With the hashing embedder only the same normalized question text is a hit
+    SEMANTIC_CACHE_ENABLED: bool = True
+    SEMANTIC_CACHE_THRESHOLD: float = 0.92
+    SEMANTIC_CACHE_MAX_ENTRIES: int = 500
+
+    # Exact-match LLM response cache (temperature 0 requests only)
+    LLM_CACHE_ENABLED: bool = True
+    LLM_CACHE_TTL_SECONDS: int = 7 * 24 * 3600
+    LLM_CACHE_MEMORY_ENTRIES: int = 1024
+    LLM_CACHE_DISK_ENTRIES: int = 100000
+
+    # Chunking: estimated tokens per chunk and tokens repeated between consecutive chunks
+    CHUNK_MAX_TOKENS: int = 256
+    CHUNK_OVERLAP_TOKENS: int = 32
+
+    # "content_addressed" stores uploads once per SHA256 in sharded blob directories;
+    # "local" keeps them at documents/{project_id}/{filename}
+    STORAGE_BACKEND: str = "content_addressed"
+
+    # Uploads are streamed to a staging file in blocks of this many bytes
+    UPLOAD_BLOCK_SIZE: int = 1024 * 1024
+    # Batch uploads enqueue one ingest job per this many new versions
+    INGEST_JOB_BATCH_SIZE: int = 100
+
+    # Streaming ingest: bytes read per storage block, chunks per DB flush / index segment
+    INGEST_READ_BLOCK_SIZE: int = 1024 * 1024
+    INGEST_BATCH_SIZE: int = 2000
+    # Parallel ingest: pool processes (0 = one per core), characters per chunking task,
+    # and how many sections / batches may be in flight between stages
+    INGEST_WORKERS: int = 0
+    INGEST_SECTION_SIZE: int = 1024 * 1024
+    INGEST_QUEUE_DEPTH: int = 4
+
+    # Keep chunk text in compressed mmap'd segment files instead of document_chunks.text
+    CHUNK_STORE_ENABLED: bool = False
+
+    # Max chunk texts kept in the worker's in-process chunk cache
+    CHUNK_CACHE_SIZE: int = 20000
+
     class Config:
         env_file = ".env"
 
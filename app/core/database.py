@@ -2,9 +2,16 @@ from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
 from app.core.config import settings
 
+# In-memory SQLite uses a single shared connection, so it takes no pool sizing
+in_memory = settings.DATABASE_URL in ("sqlite://", "sqlite:///:memory:")
+
 engine = create_engine(
     settings.DATABASE_URL,
     connect_args={"check_same_thread": False} if "sqlite" in settings.DATABASE_URL else {},
+    **({} if in_memory else {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW
+    }),
     future=True
 )
 
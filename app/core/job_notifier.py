@@ -0,0 +1,174 @@
+import atexit
+import os
+import select
+import socket
+import threading
+import time
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.database import engine
+
+JOB_CHANNEL = "jobs_created"
+
+
+class LocalJobNotifier:
+    """
+    Stand-in for LISTEN/NOTIFY on one machine, used with SQLite and in tests.
+    Each listening process binds its own loopback UDP port and registers it
+    as a "{pid}-{port}" file in JOB_NOTIFY_DIR. After the creating
+    transaction commits, publish sends a datagram to every registered port,
+    so all idle workers wake, not just one. Entries of dead processes are
+    removed by the next publisher; anything missed is covered by polling.
+    """
+    def __init__(self, registry_dir: str):
+        self.registry_dir = registry_dir
+        self._socket = None
+        self._entry = None
+
+    def publish(self, db: Session, job_type: str) -> None:
+        event.listen(db, "after_commit", lambda session: self._send(job_type), once=True)
+
+    def _send(self, job_type: str) -> None:
+        try:
+            entries = os.listdir(self.registry_dir)
+        except FileNotFoundError:
+            return
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sender:
+            for entry in entries:
+                try:
+                    pid, port = (int(part) for part in entry.split("-"))
+                except ValueError:
+                    continue
+                if not _process_alive(pid):
+                    _remove(os.path.join(self.registry_dir, entry))
+                    continue
+                try:
+                    sender.sendto(job_type.encode("utf-8"), ("127.0.0.1", port))
+                except OSError:
+                    pass
+
+    def listen(self) -> bool:
+        if self._socket is None:
+            receiver = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            try:
+                receiver.bind(("127.0.0.1", 0))
+                os.makedirs(self.registry_dir, exist_ok=True)
+                entry = os.path.join(self.registry_dir, f"{os.getpid()}-{receiver.getsockname()[1]}")
+                open(entry, "w").close()
+            except OSError as e:
+                print(f"Job notification listener failed, polling instead: {e}")
+                receiver.close()
+                return False
+            receiver.setblocking(False)
+            self._socket = receiver
+            self._entry = entry
+            atexit.register(_remove, entry)
+        return True
+
+    def wait(self, timeout: float) -> bool:
+        """
+        Blocks until a job was created or the timeout passed. Notifications
+        that arrived while nobody was waiting are queued in the socket, so the
+        next wait returns immediately.
+        """
+        if not self.listen():
+            time.sleep(timeout)
+            return False
+
+        readable, _, _ = select.select([self._socket], [], [], timeout)
+        if not readable:
+            return False
+        # Drain everything queued; one wakeup is enough to claim them all
+        while True:
+            try:
+                self._socket.recv(256)
+            except BlockingIOError:
+                return True
+
+
+class PostgresJobNotifier:
+    """
+    Wakes workers in any process through PostgreSQL LISTEN/NOTIFY. publish
+    queues a NOTIFY in the creating transaction, so it is delivered on commit
+    and dropped on rollback. Each waiting process keeps one dedicated
+    connection LISTENing; if it breaks, wait degrades to a plain sleep until
+    it can reconnect.
+    """
+    def __init__(self):
+        self._listener = None
+        self._lock = threading.Lock()
+
+    def publish(self, db: Session, job_type: str) -> None:
+        db.execute(text("SELECT pg_notify(:channel, :payload)"), {"channel": JOB_CHANNEL, "payload": job_type})
+
+    def listen(self) -> bool:
+        with self._lock:
+            try:
+                if self._listener is None:
+                    self._connect()
+                return True
+            except Exception as e:
+                print(f"Job notification listener failed, polling instead: {e}")
+                return False
+
+    def _connect(self):
+        # Held for the life of the process, never returned to the pool
+        listener = engine.raw_connection()
+        connection = listener.driver_connection
+        connection.autocommit = True
+        with connection.cursor() as cursor:
+            cursor.execute(f"LISTEN {JOB_CHANNEL}")
+        self._listener = listener
+
+    def wait(self, timeout: float) -> bool:
+        with self._lock:
+            try:
+                if self._listener is None:
+                    self._connect()
+                connection = self._listener.driver_connection
+                connection.poll()
+                if not connection.notifies and select.select([connection], [], [], timeout) != ([], [], []):
+                    connection.poll()
+                fired = bool(connection.notifies)
+                connection.notifies.clear()
+                return fired
+            except Exception as e:
+                print(f"Job notification listener failed, polling instead: {e}")
+                self._listener = None
+        time.sleep(timeout)
+        return False
+
+
+def _process_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _remove(path: str) -> None:
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+_job_notifier = None
+
+def get_job_notifier():
+    """
+    Returns the process-wide notifier, created on first use rather than at import.
+    """
+    global _job_notifier
+    if _job_notifier is None:
+        # LISTEN needs psycopg2's notifies queue; other drivers use the loopback stand-in
+        if engine.dialect.name == "postgresql" and engine.dialect.driver == "psycopg2":
+            _job_notifier = PostgresJobNotifier()
+        else:
+            _job_notifier = LocalJobNotifier(settings.JOB_NOTIFY_DIR)
+    return _job_notifier
@@ -0,0 +1,129 @@
+import re
+from typing import Iterable, Iterator
+
+from app.core.config import settings
+from app.retrieval.tokenizer import estimate_tokens
+
+# Sentence ends inside a paragraph, or section breaks: blank lines and markdown headings
+BOUNDARY = re.compile(
+    r"(?P<sentence>[.!?][\"')\]]*(?:[ \t]+(?![ \t]*\n)|[ \t]*\n(?![ \t]*\n)))"
+    r"|(?P<section>[ \t]*\n[ \t]*\n\s*|\n(?=#{1,6} ))"
+)
+
+# A chunk is closed at a paragraph boundary once it is at least this full
+PARAGRAPH_MIN_FILL = 0.5
+
+CHARS_PER_TOKEN = 4
+
+
+class Chunker:
+    """
+    Splits text into chunks of at most max_tokens (estimated) tokens.
+
+    Text is first cut into sentence units, remembering which ones end a
+    paragraph or precede a heading. Units are packed greedily; a chunk is
+    closed early at a paragraph boundary once it is half full, and chunks cut
+    mid-paragraph repeat up to overlap_tokens of trailing sentences at the
+    start of the next one. Oversized sentences are split at whitespace.
+    chunks_with_overlap also reports how many leading characters of each chunk
+    repeat the previous one, so readers can stitch neighbours exactly.
+    Works on a stream of text blocks in a single pass, so time is linear in
+    the input and memory is bounded by the chunk size.
+    """
+    def __init__(self, max_tokens: int | None = None, overlap_tokens: int | None = None):
+        self.max_tokens = max_tokens or settings.CHUNK_MAX_TOKENS
+        self.overlap_tokens = settings.CHUNK_OVERLAP_TOKENS if overlap_tokens is None else overlap_tokens
+        if self.overlap_tokens >= self.max_tokens:
+            raise ValueError("Chunk overlap must be smaller than the chunk size")
+        self.max_chars = self.max_tokens * CHARS_PER_TOKEN
+
+    def split(self, text: str) -> list[str]:
+        return list(self.chunks([text]))
+
+    def split_with_overlap(self, text: str) -> list[tuple[str, int]]:
+        return list(self.chunks_with_overlap([text]))
+
+    def chunks(self, text_blocks: Iterable[str]) -> Iterator[str]:
+        return (chunk for chunk, _ in self.chunks_with_overlap(text_blocks))
+
+    def chunks_with_overlap(self, text_blocks: Iterable[str]) -> Iterator[tuple[str, int]]:
+        """
+        Yields (chunk text, number of leading characters carried over from the
+        previous chunk). The count is 0 after a paragraph break.
+        """
+        current: list[tuple[str, int]] = []
+        current_tokens = 0
+        overlap_chars = 0
+
+        for unit, closes_section in self._units(text_blocks):
+            for piece in self._pieces(unit):
+                tokens = estimate_tokens(piece)
+                if current and current_tokens + tokens > self.max_tokens:
+                    yield "".join(text for text, _ in current), overlap_chars
+                    current = self._overlap(current, tokens)
+                    current_tokens = sum(t for _, t in current)
+                    overlap_chars = sum(len(text) for text, _ in current)
+                current.append((piece, tokens))
+                current_tokens += tokens
+
+            if closes_section and current_tokens >= self.max_tokens * PARAGRAPH_MIN_FILL:
+                yield "".join(text for text, _ in current), overlap_chars
+                current, current_tokens, overlap_chars = [], 0, 0
+
+        if current:
+            yield "".join(text for text, _ in current), overlap_chars
+
+    def _units(self, text_blocks: Iterable[str]) -> Iterator[tuple[str, bool]]:
+        """
+        Yields (sentence text including trailing whitespace, ends a section).
+        Only the unterminated tail of the previous block is carried over.
+        """
+        pending = ""
+        for block in text_blocks:
+            pending += block
+            start = 0
+            for match in BOUNDARY.finditer(pending):
+                if match.end() == len(pending):
+                    # The whitespace run may continue in the next block
+                    break
+                yield pending[start:match.end()], match.lastgroup == "section"
+                start = match.end()
+            pending = pending[start:]
+
+            # No boundary for a long stretch: cut it so the carry-over stays bounded
+            while len(pending) > 2 * self.max_chars:
+                cut = pending.rfind(" ", 0, self.max_chars) + 1 or self.max_chars
+                yield pending[:cut], False
+                pending = pending[cut:]
+
+        if pending:
+            yield pending, True
+
+    def _pieces(self, unit: str) -> Iterator[str]:
+        if len(unit) <= self.max_chars:
+            yield unit
+            return
+        start = 0
+        while len(unit) - start > self.max_chars:
+            cut = unit.rfind(" ", start, start + self.max_chars) + 1
+            if cut <= start:
+                cut = start + self.max_chars
+            yield unit[start:cut]
+            start = cut
+        if start < len(unit):
+            yield unit[start:]
+
+    def _overlap(self, units: list[tuple[str, int]], next_tokens: int) -> list[tuple[str, int]]:
+        """
+        Trailing units of the closed chunk that fit in overlap_tokens and still
+        leave room for the next piece.
+        """
+        budget = min(self.overlap_tokens, self.max_tokens - next_tokens)
+        carried, used = [], 0
+        for text, tokens in reversed(units):
+            if used + tokens > budget:
+                break
+            carried.append((text, tokens))
+            used += tokens
+        carried.reverse()
+        return carried
@@ -0,0 +1,346 @@
+import hashlib
+import multiprocessing
+import os
+import queue
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from uuid import UUID
+import numpy as np
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.ingest.chunker import Chunker
+from app.ingest.streaming import ByteCounter, iter_sections, iter_text
+from app.models.document_version import DocumentVersion
+from app.repositories.document_chunk_repository import DocumentChunkRepository
+from app.retrieval.embedder import get_embedder
+from app.retrieval.lexical_index import LexicalIndex
+from app.retrieval.tokenizer import estimate_tokens
+from app.retrieval.vector_index import VectorIndex
+from app.storage.base import Storage
+from app.storage.chunk_store import ChunkStore
+
+_pool: Executor | None = None
+_pool_lock = threading.Lock()
+
+
+def _worker_count() -> int:
+    return settings.INGEST_WORKERS or os.cpu_count() or 1
+
+
+def get_pool() -> Executor:
+    """
+    Process pool shared by all ingest jobs of this worker process. Workers are
+    spawned, not forked, because the parent already runs threads.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=_worker_count(),
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return _pool
+
+
+def reset_pool(broken: Executor) -> None:
+    """
+    Drops a pool that lost a worker process (killed, out of memory), so the
+    next get_pool call starts a fresh one. A broken pool rejects every task.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is broken:
+            _pool = None
+    broken.shutdown(wait=False, cancel_futures=True)
+
+
+def _chunk_section(text: str, max_tokens: int, overlap_tokens: int) -> tuple[list[tuple[str, str, int, int]], float]:
+    """
+    Pool task: chunks one section and hashes each chunk.
+    Returns [(text, content hash, token count, overlap chars)] and the seconds spent.
+    """
+    started = time.perf_counter()
+    chunks = [
+        (chunk, hashlib.sha256(chunk.encode("utf-8")).hexdigest(), estimate_tokens(chunk), overlap_chars)
+        for chunk, overlap_chars in Chunker(max_tokens, overlap_tokens).split_with_overlap(text)
+    ]
+    return chunks, time.perf_counter() - started
+
+
+def _embed(texts: list[str]) -> tuple[np.ndarray, float]:
+    started = time.perf_counter()
+    vectors = get_embedder().embed(texts)
+    return vectors, time.perf_counter() - started
+
+
+class StageTimes:
+    """
+    Busy seconds and item counts per pipeline stage. Pool stages report time
+    measured inside the workers, so their totals can exceed wall time.
+    """
+    def __init__(self):
+        self.seconds: dict[str, float] = {}
+        self.items: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def add(self, stage: str, seconds: float, items: int = 0) -> None:
+        with self._lock:
+            self.seconds[stage] = self.seconds.get(stage, 0.0) + seconds
+            self.items[stage] = self.items.get(stage, 0) + items
+
+    def as_dict(self) -> dict:
+        return {
+            stage: {"seconds": round(seconds, 3), "items": self.items[stage]}
+            for stage, seconds in self.seconds.items()
+        }
+
+
+class IngestResult:
+    def __init__(self, chunk_count: int, reused_count: int, bytes_read: int, elapsed: float, stages: dict):
+        self.chunk_count = chunk_count
+        self.reused_count = reused_count
+        self.bytes_read = bytes_read
+        self.elapsed = elapsed
+        self.stages = stages
+
+
+class IngestPipeline:
+    """
+    Ingests one document version in overlapping stages:
+
+        read + decode (thread) -> chunk + hash (process pool)
+            -> reuse lookup, DB write, index append (caller's thread)
+            -> embed (process pool, or threads for remote embedders)
+
+    The reader splits text into sections at blank lines and submits each to
+    the pool; a bounded queue of pending sections stops it from running ahead
+    of the writer. Sections come back in order, are regrouped into batches of
+    INGEST_BATCH_SIZE, and at most INGEST_QUEUE_DEPTH batches are embedding
+    while the writer handles earlier ones. The DB session is only touched
+    from the caller's thread.
+
+    Index segments are written but not published: the caller commits the
+    chunk rows first and then calls publish, or discard if the ingest failed,
+    so searches never see chunk ids that are not in the database.
+    """
+    def __init__(self, db: Session, storage: Storage, project_id: UUID):
+        self.chunk_repo = DocumentChunkRepository(db)
+        self.storage = storage
+        self.vector_index = VectorIndex(project_id, storage)
+        self.lexical_index = LexicalIndex(project_id, storage)
+        self.chunk_store = ChunkStore(storage)
+        self.segments_written = 0
+        self.version_id: UUID | None = None
+        self.pending_vectors: list[str] = []
+        self.pending_lexical: list[str] = []
+        self.embedder = get_embedder()
+        self.times = StageTimes()
+
+    def _embed_executor(self, pool: Executor) -> Executor:
+        # Local embedders are CPU-bound; API embedders mostly wait on the network
+        if settings.EMBEDDING_BACKEND == "hashing":
+            return pool
+        return ThreadPoolExecutor(max_workers=_worker_count())
+
+    def run(self, version: DocumentVersion, previous: DocumentVersion | None) -> IngestResult:
+        reader = ByteCounter(self.storage.read_stream(version.file_path, settings.INGEST_READ_BLOCK_SIZE))
+
+        # Drop index segments left behind by an earlier failed attempt
+        self.version_id = version.id
+        self.vector_index.remove_version(version.id)
+        self.lexical_index.remove_version(version.id)
+        self.chunk_store.remove_version(version.id)
+
+        pool = get_pool()
+        sections: queue.Queue = queue.Queue(maxsize=settings.INGEST_QUEUE_DEPTH)
+        stop = threading.Event()
+        read_thread = threading.Thread(target=self._read, args=(pool, reader, sections, stop), daemon=True)
+        read_thread.start()
+
+        embed_executor = self._embed_executor(pool)
+        in_flight: deque = deque()
+        chunk_count = 0
+        reused_count = 0
+        try:
+            for batch in self._batches(sections):
+                rows, vectors, term_counts = self._prepare(version, previous, batch, chunk_count)
+                chunk_count += len(rows)
+                changed = [i for i, vector in enumerate(vectors) if vector is None]
+                reused_count += len(rows) - len(changed)
+                future = embed_executor.submit(_embed, [rows[i]["text"] for i in changed]) if changed else None
+                in_flight.append((version.id, rows, vectors, term_counts, changed, future))
+                if len(in_flight) >= settings.INGEST_QUEUE_DEPTH:
+                    self._write(*in_flight.popleft())
+            while in_flight:
+                self._write(*in_flight.popleft())
+        except BrokenProcessPool:
+            # Fails this attempt; the job's retry runs on a new pool
+            reset_pool(pool)
+            raise
+        finally:
+            stop.set()
+            for *_, future in in_flight:
+                if future:
+                    future.cancel()
+            if embed_executor is not pool:
+                embed_executor.shutdown(wait=False)
+            read_thread.join()
+
+        return IngestResult(chunk_count, reused_count, reader.bytes_read, reader.elapsed, self.times.as_dict())
+
+    def publish(self) -> None:
+        """
+        Makes the written index segments searchable. Call after the chunk rows are committed.
+        """
+        self.vector_index.publish(self.version_id, self.pending_vectors)
+        self.lexical_index.publish(self.version_id, self.pending_lexical)
+        self.pending_vectors, self.pending_lexical = [], []
+
+    def discard(self) -> None:
+        """
+        Deletes everything a failed run wrote outside the database.
+        """
+        self.vector_index.discard(self.pending_vectors)
+        self.lexical_index.discard(self.pending_lexical)
+        self.pending_vectors, self.pending_lexical = [], []
+        if self.version_id:
+            self.chunk_store.remove_version(self.version_id)
+
+    def _read(self, pool: Executor, reader: ByteCounter, sections: queue.Queue, stop: threading.Event) -> None:
+        """
+        Reader thread: storage blocks -> text -> sections submitted to the pool.
+        Ends with None, or with the exception that stopped it.
+        """
+        min_chars = settings.INGEST_SECTION_SIZE
+        try:
+            blocks = iter_sections(iter_text(reader), min_chars)
+            while not stop.is_set():
+                started = time.perf_counter()
+                section = next(blocks, None)
+                self.times.add("read", time.perf_counter() - started, 1 if section is not None else 0)
+                if section is None:
+                    break
+                future = pool.submit(_chunk_section, section, settings.CHUNK_MAX_TOKENS, settings.CHUNK_OVERLAP_TOKENS)
+                self._put(sections, future, stop)
+            self._put(sections, None, stop)
+        except BaseException as e:
+            self._put(sections, e, stop)
+
+    def _put(self, sections: queue.Queue, item, stop: threading.Event) -> None:
+        # Blocks while the queue is full (backpressure), but gives up once the consumer stopped
+        while not stop.is_set():
+            try:
+                sections.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def _batches(self, sections: queue.Queue):
+        batch = []
+        while True:
+            item = sections.get()
+            if item is None:
+                break
+            if isinstance(item, BaseException):
+                raise item
+            chunks, seconds = item.result()
+            self.times.add("chunk", seconds, len(chunks))
+            for chunk in chunks:
+                batch.append(chunk)
+                if len(batch) >= settings.INGEST_BATCH_SIZE:
+                    yield batch
+                    batch = []
+        if batch:
+            yield batch
+
+    def _prepare(
+        self,
+        version: DocumentVersion,
+        previous: DocumentVersion | None,
+        batch: list[tuple[str, str, int, int]],
+        first_index: int
+    ) -> tuple[list[dict], list, list]:
+        """
+        Builds chunk rows and picks up what is already known about chunks
+        whose text is unchanged since the previous version: their token
+        count, their place in the chunk store, their vector and their BM25
+        term counts. Rows stay per version, since AI runs and the chunk
+        cache refer to chunks of one version by id.
+        """
+        started = time.perf_counter()
+        hashes = [content_hash for _, content_hash, _, _ in batch]
+        matches = self.chunk_repo.find_by_hashes(previous.id, hashes) if previous else {}
+        previous_ids = [match.id for match in matches.values()]
+        previous_vectors = self.vector_index.get_vectors(previous.id, previous_ids) if matches else {}
+        previous_terms = self.lexical_index.get_term_counts(previous.id, previous_ids) if matches else {}
+
+        rows, vectors, term_counts = [], [], []
+        for i, (text, content_hash, token_count, overlap_chars) in enumerate(batch):
+            row = {
+                "id": uuid.uuid4(),
+                "document_version_id": version.id,
+                "chunk_index": first_index + i,
+                "text": text,
+                "content_hash": content_hash,
+                "token_count": token_count,
+                "overlap_chars": overlap_chars,
+                "store_segment": None,
+                "store_slot": None
+            }
+            vector = None
+            match = matches.get(content_hash)
+            if match:
+                candidate = previous_vectors.get(match.id)
+                if candidate is not None and candidate.shape == (self.embedder.dim,):
+                    vector = candidate
+                if match.token_count is not None:
+                    row["token_count"] = match.token_count
+                if settings.CHUNK_STORE_ENABLED and match.store_segment is not None:
+                    # Points at the text already stored for the previous version
+                    row["store_segment"] = self.chunk_store.qualified_name(previous.id, match.store_segment)
+                    row["store_slot"] = match.store_slot
+            rows.append(row)
+            vectors.append(vector)
+            term_counts.append(previous_terms.get(match.id) if match else None)
+        self.times.add("reuse", time.perf_counter() - started, sum(v is not None for v in vectors))
+        return rows, vectors, term_counts
+
+    def _write(
+        self,
+        version_id: UUID,
+        rows: list[dict],
+        vectors: list,
+        term_counts: list,
+        changed: list[int],
+        future
+    ) -> None:
+        if future:
+            embedded, seconds = future.result()
+            self.times.add("embed", seconds, len(changed))
+            for i, vector in zip(changed, embedded):
+                vectors[i] = vector
+
+        started = time.perf_counter()
+        texts = [row["text"] for row in rows]
+        if settings.CHUNK_STORE_ENABLED:
+            # New text goes to one compressed segment; the rows only point into it
+            new_rows = [row for row in rows if row["store_segment"] is None]
+            if new_rows:
+                name = self.chunk_store.write_segment(version_id, self.segments_written, [row["text"] for row in new_rows])
+                self.segments_written += 1
+                for slot, row in enumerate(new_rows):
+                    row.update(store_segment=name, store_slot=slot)
+            for row in rows:
+                row["text"] = None
+
+        # Plain rows through COPY / executemany, no ORM objects to track
+        self.chunk_repo.bulk_insert(rows)
+        chunk_ids = [row["id"] for row in rows]
+        self.pending_vectors.append(self.vector_index.write_pending(version_id, chunk_ids, np.vstack(vectors)))
+        self.pending_lexical.append(self.lexical_index.write_pending(version_id, chunk_ids, texts, term_counts))
+        self.times.add("write", time.perf_counter() - started, len(rows))
@@ -0,0 +1,80 @@
+import codecs
+import re
+import time
+from typing import Iterable, Iterator
+
+
+# Blank line (plus any following whitespace): a place where chunking can restart
+SECTION_BREAK = re.compile(r"\n[ \t]*\n\s*")
+
+
+class ByteCounter:
+    """
+    Wraps a byte-block iterator and tracks how much was read and how fast.
+    """
+    def __init__(self, blocks: Iterable[bytes]):
+        self._blocks = blocks
+        self.bytes_read = 0
+        self.started_at = time.perf_counter()
+
+    def __iter__(self) -> Iterator[bytes]:
+        for block in self._blocks:
+            self.bytes_read += len(block)
+            yield block
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started_at
+
+    @property
+    def bytes_per_second(self) -> float:
+        return self.bytes_read / self.elapsed if self.elapsed > 0 else 0.0
+
+
+def iter_text(blocks: Iterable[bytes], encoding: str = "utf-8") -> Iterator[str]:
+    """
+    Decodes a stream of byte blocks incrementally. Multi-byte characters split
+    across block boundaries are carried over instead of failing the decode.
+    """
+    decoder = codecs.getincrementaldecoder(encoding)(errors="strict")
+    for block in blocks:
+        text = decoder.decode(block)
+        if text:
+            yield text
+    tail = decoder.decode(b"", final=True)
+    if tail:
+        yield tail
+
+
+def batched(items: Iterable, size: int) -> Iterator[list]:
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def iter_sections(text_blocks: Iterable[str], min_chars: int) -> Iterator[str]:
+    """
+    Regroups decoded text into sections of at least min_chars that end after a
+    blank line, so each section can be chunked independently. Text without any
+    blank line is cut at whitespace once it reaches 4 * min_chars.
+    """
+    pending = ""
+    for block in text_blocks:
+        pending += block
+        while len(pending) > min_chars:
+            match = SECTION_BREAK.search(pending, min_chars)
+            if match and match.end() < len(pending):
+                cut = match.end()
+            elif len(pending) >= 4 * min_chars:
+                cut = pending.rfind(" ", min_chars) + 1 or len(pending)
+            else:
+                break
+            yield pending[:cut]
+            pending = pending[cut:]
+    if pending:
+        yield pending
@@ -3,6 +3,7 @@ from .document_version import DocumentVersion
 from .document_chunk import DocumentChunk
 from .job import Job
 from .ai_run import AIRun
+from .answer_cache_entry import AnswerCacheEntry
 from app.core.database import Base
 
 from .user import User
@@ -50,6 +50,9 @@ class AIRun(Base):
     #Prompt input
     input_payload=Column(JSON,nullable=True)
 
+    #Per-stage retrieval latency and candidate counts
+    retrieval_stats=Column(JSON,nullable=True)
+
     #LLM response 
     output_payload=Column(JSON,nullable=True)
 
@@ -0,0 +1,60 @@
+import uuid
+from sqlalchemy import (
+    Column,
+    String,
+    Integer,
+    DateTime,
+    ForeignKey,
+    LargeBinary,
+    Text
+)
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.sql import func
+from sqlalchemy.types import JSON
+from app.core.database import Base
+
+class AnswerCacheEntry(Base):
+    __tablename__="answer_cache_entries"
+
+    id=Column(
+        UUID(as_uuid=True),
+        primary_key=True,
+        default=uuid.uuid4
+    )
+
+    project_id=Column(
+        UUID(as_uuid=True),
+        ForeignKey("projects.id"),
+        nullable=False
+    )
+
+    #SHA256 over run type + sorted version ids: answers are only reused for the exact same documents
+    version_key=Column(String(64), nullable=False, index=True)
+
+    #Used to invalidate entries when one of the documents gets a new version
+    document_ids=Column(JSON, nullable=False)
+
+    question=Column(Text, nullable=False)
+
+    #float32 bytes of the question embedding
+    question_embedding=Column(LargeBinary, nullable=False)
+
+    output_payload=Column(JSON, nullable=False)
+
+    source_run_id=Column(
+        UUID(as_uuid=True),
+        ForeignKey("ai_runs.id"),
+        nullable=True
+    )
+
+    hit_count=Column(Integer, nullable=False, default=0)
+
+    last_used_at=Column(
+        DateTime(timezone=True),
+        server_default=func.now()
+    )
+
+    created_at=Column(
+        DateTime(timezone=True),
+        server_default=func.now()
+    )
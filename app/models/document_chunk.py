@@ -1,5 +1,5 @@
 import uuid
-from sqlalchemy import Column, Integer, Text, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -24,7 +24,23 @@ class DocumentChunk(Base):
     # Order matters for context reconstruction
     chunk_index = Column(Integer, nullable=False)
     
-    text = Column(Text, nullable=False)
+    # Empty when the text lives in the chunk store (see store_segment / store_slot)
+    text = Column(Text, nullable=True)
+
+    # SHA256 of text, lets AI runs reference chunks instead of copying them
+    # and lets a new version reuse the derived data of unchanged chunks
+    content_hash = Column(String(64), nullable=True, index=True)
+
+    # Estimated token count, precomputed at ingest for context packing
+    token_count = Column(Integer, nullable=True)
+
+    # Leading characters repeated from the previous chunk, stripped when the
+    # two are stitched together; empty for chunks written before it was recorded
+    overlap_chars = Column(Integer, nullable=True)
+
+    # Location of the text in the compressed chunk store, when CHUNK_STORE_ENABLED
+    store_segment = Column(String, nullable=True)
+    store_slot = Column(Integer, nullable=True)
     
     created_at = Column(
         DateTime(timezone=True),
@@ -26,14 +26,17 @@ class DocumentVersion(Base):
     # Storage Abstraction (S3 path or local path)
     file_path = Column(String, nullable=False)
     
-    # Integrity Check (SHA256 usually)
-    content_hash = Column(String, nullable=False)
+    # Integrity Check (SHA256 usually), indexed for upload dedup
+    content_hash = Column(String, nullable=False, index=True)
     
     created_by = Column(
         UUID(as_uuid=True),
         ForeignKey("users.id"),
         nullable=False
     )
+
+    # PENDING until the ingest commits its chunks (READY) or gives up on this version (FAILED)
+    ingest_status = Column(String, nullable=False, default="PENDING")
     
     created_at = Column(
         DateTime(timezone=True),
@@ -5,6 +5,7 @@ from sqlalchemy import (
     Integer,
     DateTime,
     ForeignKey,
+    Index,
     Text,
     null
 )
@@ -14,6 +15,9 @@ from sqlalchemy.sql import func
 from sqlalchemy.types import JSON
 from app.core.database import Base
 
+DEFAULT_JOB_PRIORITY=10
+DEFAULT_JOB_LEASE_SECONDS=3600
+
 class Job(Base):
     __tablename__="jobs"
 
@@ -33,6 +37,9 @@ class Job(Base):
 
     status=Column(String ,nullable=False, default="PENDING")
 
+    #Scheduling class, lower runs first; set from JOB_PRIORITIES when the job is created
+    priority=Column(Integer, nullable=False, default=DEFAULT_JOB_PRIORITY)
+
     target_type=Column(String, nullable=False)
     target_id=Column(UUID(as_uuid=True), nullable=False)
 
@@ -52,6 +59,14 @@ class Job(Base):
     started_at=Column(DateTime(timezone=True), nullable=True)
     completed_at=Column(DateTime(timezone=True), nullable=True)
 
+    __table_args__ = (
+        Index("ix_jobs_status_priority_created_at", "status", "priority", "created_at"),
+        Index("ix_jobs_status_project_id", "status", "project_id"),
+        #Per-project, per-type queue order used by claim_next
+        Index("ix_jobs_status_type_project_queue", "status", "job_type", "project_id", "priority", "created_at"),
+        Index("ix_jobs_target_id_job_type", "target_id", "job_type"),
+    )
+
     # Relationships
     project=relationship("Project", back_populates="jobs")
     ai_run=relationship("AIRun", back_populates="job")
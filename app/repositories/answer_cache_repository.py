@@ -0,0 +1,71 @@
+from uuid import UUID
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import func
+from app.models.answer_cache_entry import AnswerCacheEntry
+
+class AnswerCacheRepository:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def create(self, entry: AnswerCacheEntry) -> AnswerCacheEntry:
+        self.db.add(entry)
+        self.db.flush()
+        return entry
+
+    def list_by_key(self, project_id: UUID, version_key: str) -> list[AnswerCacheEntry]:
+        return (
+            self.db.query(AnswerCacheEntry)
+            .filter(
+                AnswerCacheEntry.project_id == project_id,
+                AnswerCacheEntry.version_key == version_key
+            )
+            .all()
+        )
+
+    def touch(self, entry: AnswerCacheEntry) -> None:
+        """
+        Records a hit; the Service/worker commits.
+        """
+        entry.hit_count = (entry.hit_count or 0) + 1
+        entry.last_used_at = func.now()
+        self.db.flush()
+
+    def evict_least_recently_used(self, project_id: UUID, keep: int) -> int:
+        """
+        Deletes all but the `keep` most recently used entries of a project.
+        """
+        stale_ids = [
+            row.id
+            for row in (
+                self.db.query(AnswerCacheEntry.id)
+                .filter(AnswerCacheEntry.project_id == project_id)
+                .order_by(AnswerCacheEntry.last_used_at.desc(), AnswerCacheEntry.created_at.desc())
+                .offset(keep)
+                .all()
+            )
+        ]
+        if stale_ids:
+            self.db.query(AnswerCacheEntry).filter(
+                AnswerCacheEntry.id.in_(stale_ids)
+            ).delete(synchronize_session=False)
+        return len(stale_ids)
+
+    def delete_for_document(self, project_id: UUID, document_id: UUID) -> int:
+        """
+        Deletes every entry of the project whose answer was built from the document.
+        The per-project size cap keeps this scan small.
+        """
+        stale_ids = [
+            row.id
+            for row in (
+                self.db.query(AnswerCacheEntry.id, AnswerCacheEntry.document_ids)
+                .filter(AnswerCacheEntry.project_id == project_id)
+                .all()
+            )
+            if str(document_id) in row.document_ids
+        ]
+        if stale_ids:
+            self.db.query(AnswerCacheEntry).filter(
+                AnswerCacheEntry.id.in_(stale_ids)
+            ).delete(synchronize_session=False)
+        return len(stale_ids)
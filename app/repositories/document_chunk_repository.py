@@ -1,7 +1,20 @@
+import io
 from uuid import UUID
-from typing import List
+from typing import Iterator, List
+from sqlalchemy import case, insert
 from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
 from app.models.document_chunk import DocumentChunk
+from app.storage.chunk_store import get_chunk_store
+
+def _csv_field(value) -> str:
+    # COPY's CSV format reads a bare empty field as NULL and a quoted one as text
+    if value is None:
+        return ""
+    if isinstance(value, int):
+        return str(value)
+    return '"' + str(value).replace('"', '""') + '"'
+
 
 class DocumentChunkRepository:
     def __init__(self, db: Session):
@@ -14,17 +27,124 @@ class DocumentChunkRepository:
         self.db.add_all(chunks)
         self.db.flush()  # Pushes data to DB, waiting for final Service commit
 
+    def bulk_insert(self, rows: List[dict]):
+        """
+        Writes chunk rows given as plain dicts (with their id already set)
+        without creating ORM objects. Uses COPY on PostgreSQL and an
+        executemany INSERT elsewhere. Runs in the session's transaction.
+        """
+        if not rows:
+            return
+        dialect = self.db.get_bind().dialect
+        if dialect.name == "postgresql" and dialect.driver in ("psycopg2", "psycopg"):
+            self._copy_rows(rows, dialect.driver)
+        else:
+            self.db.execute(insert(DocumentChunk.__table__), rows)
+
+    def _copy_rows(self, rows: List[dict], driver: str):
+        columns = [
+            "id", "document_version_id", "chunk_index", "text",
+            "content_hash", "token_count", "overlap_chars", "store_segment", "store_slot"
+        ]
+        buffer = io.StringIO()
+        for row in rows:
+            buffer.write(",".join(_csv_field(row.get(column)) for column in columns))
+            buffer.write("\n")
+        buffer.seek(0)
+
+        sql = f"COPY {DocumentChunk.__tablename__} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)"
+        cursor = self.db.connection().connection.cursor()
+        try:
+            if driver == "psycopg2":
+                cursor.copy_expert(sql, buffer)
+            else:
+                with cursor.copy(sql) as copy:
+                    copy.write(buffer.getvalue())
+        finally:
+            cursor.close()
+
+    def _load_stored_text(self, chunks: List[DocumentChunk]) -> List[DocumentChunk]:
+        """
+        Fills in text kept in the chunk store. Set as committed state, so the
+        rows are not seen as modified and the text is never written back.
+        """
+        store = get_chunk_store()
+        for chunk in chunks:
+            if chunk.text is None and chunk.store_segment is not None:
+                text = store.read(chunk.document_version_id, chunk.store_segment, chunk.store_slot)
+                set_committed_value(chunk, "text", text)
+        return chunks
+
     def list_by_version(self, version_id: UUID) -> List[DocumentChunk]:
         """
         Returns chunks ordered by their index to reconstruct text flow.
         """
-        return (
+        return self._load_stored_text(
             self.db.query(DocumentChunk)
             .filter(DocumentChunk.document_version_id == version_id)
             .order_by(DocumentChunk.chunk_index.asc())
             .all()
         )
 
+    def stream_refs_by_versions(self, version_ids: List[UUID], batch_size: int = 1000) -> Iterator:
+        """
+        Streams lightweight chunk references for several versions in one query,
+        ordered by version then chunk index. Text is only fetched for legacy
+        rows that have no stored content hash.
+        """
+        if not version_ids:
+            return iter(())
+        return (
+            self.db.query(
+                DocumentChunk.id,
+                DocumentChunk.document_version_id,
+                DocumentChunk.chunk_index,
+                DocumentChunk.content_hash,
+                DocumentChunk.token_count,
+                DocumentChunk.overlap_chars,
+                case((DocumentChunk.content_hash.is_(None), DocumentChunk.text), else_=None).label("legacy_text")
+            )
+            .filter(DocumentChunk.document_version_id.in_(version_ids))
+            .order_by(DocumentChunk.document_version_id, DocumentChunk.chunk_index.asc())
+            .yield_per(batch_size)
+        )
+
+    def list_by_ids(self, chunk_ids: List[UUID]) -> List[DocumentChunk]:
+        """
+        Fetches a set of chunks (e.g. retrieval hits) in a single query.
+        """
+        if not chunk_ids:
+            return []
+        return self._load_stored_text(
+            self.db.query(DocumentChunk)
+            .filter(DocumentChunk.id.in_(chunk_ids))
+            .all()
+        )
+
+    def find_by_hashes(self, version_id: UUID, content_hashes: List[str]) -> dict:
+        """
+        Maps content hashes to rows (id, token_count, store_segment,
+        store_slot) of chunks of a version that have the same text. Used to
+        reuse work from a previous version.
+        """
+        if not content_hashes:
+            return {}
+        rows = (
+            self.db.query(
+                DocumentChunk.content_hash,
+                DocumentChunk.id,
+                DocumentChunk.token_count,
+                DocumentChunk.store_segment,
+                DocumentChunk.store_slot
+            )
+            .filter(
+                DocumentChunk.document_version_id == version_id,
+                DocumentChunk.content_hash.in_(set(content_hashes))
+            )
+            .all()
+        )
+        return {row.content_hash: row for row in rows}
+
     def hash_chunks(self, version_id: UUID) ->bool:
         """
         Idempotency check to ensure chunks are not re-hashed.
@@ -1,5 +1,7 @@
 from uuid import UUID
+from sqlalchemy import and_, func, select
 from sqlalchemy.orm import Session
+from app.models.document import Document
 from app.models.document_version import DocumentVersion
 
 class DocumentVersionRepository:
@@ -11,6 +13,11 @@ class DocumentVersionRepository:
         self.db.flush() 
         return version
 
+    def mark_ingest_status(self, version: DocumentVersion, status: str) -> DocumentVersion:
+        version.ingest_status = status
+        self.db.flush()
+        return version
+
     def get_latest(self, document_id: UUID) -> DocumentVersion | None:
         """
         Returns the version with the highest version_number.
@@ -22,6 +29,88 @@ class DocumentVersionRepository:
             .first()
         )
 
+    def find_by_content_hash(self, project_id: UUID, content_hash: str) -> DocumentVersion | None:
+        """
+        Returns the newest version in the project with identical bytes, skipping
+        deleted documents and versions whose ingest failed.
+        """
+        return self.find_by_content_hashes(project_id, [content_hash]).get(content_hash)
+
+    def find_by_content_hashes(self, project_id: UUID, content_hashes: list[str]) -> dict[str, DocumentVersion]:
+        """
+        Set-based form of find_by_content_hash: maps each hash that already
+        exists in the project to its newest version, in one query.
+        """
+        if not content_hashes:
+            return {}
+        versions = (
+            self.db.query(DocumentVersion)
+            .join(Document, Document.id == DocumentVersion.document_id)
+            .filter(
+                DocumentVersion.content_hash.in_(set(content_hashes)),
+                Document.project_id == project_id,
+                Document.is_deleted == False,
+                DocumentVersion.ingest_status != "FAILED"
+            )
+            .order_by(DocumentVersion.created_at.asc())
+            .all()
+        )
+        # Ascending order, so the newest version of each hash wins
+        return {version.content_hash: version for version in versions}
+
+    def get_previous(self, version: DocumentVersion) -> DocumentVersion | None:
+        """
+        Returns the version of the same document right before the given one.
+        """
+        return (
+            self.db.query(DocumentVersion)
+            .filter(
+                DocumentVersion.document_id == version.document_id,
+                DocumentVersion.version_number < version.version_number
+            )
+            .order_by(DocumentVersion.version_number.desc())
+            .first()
+        )
+
+    def get_latest_for_documents(
+        self,
+        project_id: UUID,
+        document_ids: list[UUID]
+    ) -> list[tuple[Document, DocumentVersion | None]]:
+        """
+        Loads the requested documents of a project together with their latest
+        version in a single query (ROW_NUMBER window over version_number).
+        Documents outside the project or deleted are simply not returned,
+        so callers can validate ownership by comparing ids.
+        """
+        if not document_ids:
+            return []
+
+        ranked = (
+            select(
+                DocumentVersion.id.label("version_id"),
+                DocumentVersion.document_id.label("document_id"),
+                func.row_number().over(
+                    partition_by=DocumentVersion.document_id,
+                    order_by=DocumentVersion.version_number.desc()
+                ).label("rank")
+            )
+            .where(DocumentVersion.document_id.in_(document_ids))
+            .subquery()
+        )
+
+        return (
+            self.db.query(Document, DocumentVersion)
+            .outerjoin(ranked, and_(ranked.c.document_id == Document.id, ranked.c.rank == 1))
+            .outerjoin(DocumentVersion, DocumentVersion.id == ranked.c.version_id)
+            .filter(
+                Document.id.in_(document_ids),
+                Document.project_id == project_id,
+                Document.is_deleted == False
+            )
+            .all()
+        )
+
     def list_by_document(self, document_id: UUID) -> list[DocumentVersion]:
         """
         Returns full history ordered by version number (1, 2, 3...).
@@ -1,15 +1,23 @@
+from datetime import datetime, timedelta, timezone
 from uuid import UUID
-from sqlalchemy.orm import Session
+from sqlalchemy import and_, case, or_, select, true, update
+from sqlalchemy.orm import Session, aliased
 from sqlalchemy.sql import func
-from app.models.job import Job
+from app.models.job import DEFAULT_JOB_LEASE_SECONDS, DEFAULT_JOB_PRIORITY, Job
+from app.core.config import settings
+from app.core.job_notifier import get_job_notifier
 
 class JobRepository:
     def __init__(self,db:Session):
         self.db=db
     
     def create(self,job:Job)->Job:
+        if job.priority is None:
+            job.priority=settings.JOB_PRIORITIES.get(job.job_type,DEFAULT_JOB_PRIORITY)
         self.db.add(job)
         self.db.flush()
+        #Wakes idle workers once the caller's transaction commits
+        get_job_notifier().publish(self.db, job.job_type)
         return job
     
     def get_by_id(self,job_id:UUID)->Job | None:
@@ -23,23 +31,190 @@ class JobRepository:
         return (
             self.db.query(Job)
             .filter(Job.status=="PENDING")
-            .order_by(Job.created_at.asc())
+            .order_by(Job.priority.asc(),Job.created_at.asc())
             .limit(limit)
             .all()
         )
     
+    def requeue_expired(self)->int:
+        """
+        Puts RUNNING jobs whose lease ran out (JOB_LEASE_SECONDS since they
+        were claimed, or no start time at all) back to PENDING. Their worker
+        is presumed dead, so the lost run counts as a failed attempt, as in
+        record_results: the job is FAILED once max_attempts is reached.
+        Runs in the caller's transaction and returns how many jobs it moved.
+        """
+        now=datetime.now(timezone.utc)
+        cutoff=now-timedelta(seconds=DEFAULT_JOB_LEASE_SECONDS)
+        if settings.JOB_LEASE_SECONDS:
+            cutoff=case(
+                {job_type:now-timedelta(seconds=seconds) for job_type,seconds in settings.JOB_LEASE_SECONDS.items()},
+                value=Job.job_type,
+                else_=cutoff
+            )
+        exhausted=Job.attempts+1>=Job.max_attempts
+        result=self.db.execute(
+            update(Job)
+            .where(Job.status=="RUNNING",or_(Job.started_at.is_(None),Job.started_at<cutoff))
+            .values(
+                attempts=Job.attempts+1,
+                last_error="lease expired: worker did not report the job's outcome",
+                status=case((exhausted,"FAILED"),else_="PENDING"),
+                completed_at=case((exhausted,func.now()),else_=Job.completed_at)
+            )
+            .execution_options(synchronize_session=False)
+        )
+        return result.rowcount
+
+    def claim_next(self,limit:int =1,job_types:list[str] | None =None)->list[Job]:
+        """
+        Atomically moves up to `limit` PENDING jobs to RUNNING and returns them.
+        On PostgreSQL the candidate rows are locked with FOR UPDATE SKIP LOCKED,
+        so concurrent workers claim disjoint jobs without waiting on each other.
+        SQLite has no row locks, but the UPDATE takes the database write lock
+        before reading, which gives the same guarantee. Optionally restricted
+        to some job types. The claimed jobs are reloaded with one SELECT after
+        the commit, so reading them costs no per-job refresh.
+
+        Jobs are picked fairly rather than strictly oldest first:
+          - lower priority classes (JOB_PRIORITIES) always go first;
+          - within a class, projects take turns: a project's n-th oldest
+            pending job of a type ranks as n plus the jobs of that type it
+            already has running, so a project with a huge backlog or many
+            running jobs cannot crowd out the others;
+          - PROJECT_CONCURRENCY caps running jobs per project and type.
+        The cap is checked against committed RUNNING rows, so workers
+        claiming at the same instant may briefly overshoot it. Jobs whose
+        lease expired are requeued first, in the same transaction, so a
+        dead worker's jobs neither count toward the cap nor stay stuck.
+
+        Only the first `limit` pending jobs of each (project, type) queue are
+        ranked, and the queues are found with an index skip scan, so a claim
+        costs O(queues * limit) index lookups however long the backlog is.
+        """
+        self.requeue_expired()
+
+        filters=[Job.status=="PENDING"]
+        if job_types is not None:
+            filters.append(Job.job_type.in_(job_types))
+
+        #Distinct (type, project) pairs with pending jobs, found by skipping through
+        #ix_jobs_status_type_project_queue: one index seek per pair, not a backlog scan
+        first=(
+            select(Job.job_type,Job.project_id)
+            .where(*filters)
+            .order_by(Job.job_type,Job.project_id)
+            .limit(1)
+            .subquery()
+        )
+        groups=select(first.c.job_type,first.c.project_id).cte("job_groups",recursive=True)
+        #Next project of the same type, else the first project of the next type; two plain
+        #range seeks, since a row-value (type, project) > (...) range is not seekable everywhere
+        same_type=(
+            select(Job.id)
+            .where(*filters,Job.job_type==groups.c.job_type,Job.project_id>groups.c.project_id)
+            .order_by(Job.project_id)
+            .limit(1)
+            .correlate(groups)
+            .scalar_subquery()
+        )
+        next_type=(
+            select(Job.id)
+            .where(*filters,Job.job_type>groups.c.job_type)
+            .order_by(Job.job_type,Job.project_id)
+            .limit(1)
+            .correlate(groups)
+            .scalar_subquery()
+        )
+        following=func.coalesce(same_type,next_type)
+        next_job=aliased(Job)
+        groups=groups.union_all(
+            select(next_job.job_type,next_job.project_id).join_from(groups,next_job,next_job.id==following)
+        )
+
+        #Only the first `limit` jobs of each queue can be claimed now, so only they are ranked
+        head=aliased(Job)
+        head_ids=(
+            select(head.id)
+            .where(
+                head.status=="PENDING",
+                head.job_type==groups.c.job_type,
+                head.project_id==groups.c.project_id
+            )
+            .order_by(head.priority.asc(),head.created_at.asc())
+            .limit(limit)
+            .correlate(groups)
+        )
+        #SQLite has no LATERAL; there a correlated IN drives the same per-queue lookups
+        if self.db.get_bind().dialect.name=="postgresql":
+            heads=head_ids.lateral("heads")
+            heads=select(heads.c.id).select_from(groups).join(heads,true())
+        else:
+            heads=select(head.id).select_from(groups).join(head,head.id.in_(head_ids))
+
+        running=(
+            select(Job.project_id,Job.job_type,func.count().label("running"))
+            .where(Job.status=="RUNNING")
+            .group_by(Job.project_id,Job.job_type)
+            .subquery()
+        )
+        pending=(
+            select(
+                Job.id,
+                Job.job_type,
+                Job.priority,
+                Job.created_at,
+                func.row_number().over(
+                    partition_by=(Job.project_id,Job.job_type),
+                    order_by=(Job.priority.asc(),Job.created_at.asc())
+                ).label("turn"),
+                func.coalesce(running.c.running,0).label("running")
+            )
+            .outerjoin(running,and_(running.c.project_id==Job.project_id,running.c.job_type==Job.job_type))
+            .where(Job.id.in_(heads))
+            .subquery()
+        )
+
+        share=pending.c.turn+pending.c.running
+        #Window functions can't be locked, so only the jobs table is locked here; the status
+        #is rechecked on the locked row, so a job claimed meanwhile by another worker drops out
+        candidates=select(Job.id).join(pending,pending.c.id==Job.id).where(Job.status=="PENDING")
+        if settings.PROJECT_CONCURRENCY:
+            cap=case(settings.PROJECT_CONCURRENCY,value=pending.c.job_type,else_=None)
+            candidates=candidates.where(or_(cap.is_(None),share<=cap))
+        candidates=(
+            candidates
+            .order_by(pending.c.priority.asc(),share.asc(),pending.c.created_at.asc())
+            .limit(limit)
+            .with_for_update(skip_locked=True,of=Job)
+        )
+        claimed=self.db.scalars(
+            update(Job)
+            .where(Job.id.in_(candidates.scalar_subquery()))
+            .values(status="RUNNING", started_at=func.now())
+            .returning(Job)
+            .execution_options(synchronize_session=False)
+        ).all()
+        self.db.commit()
+        if not claimed:
+            return claimed
+        return (
+            self.db.query(Job)
+            .filter(Job.id.in_([job.id for job in claimed]))
+            .order_by(Job.priority.asc(),Job.created_at.asc())
+            .all()
+        )
+
     def mark_running(self,job:Job)->Job:
         job.status="RUNNING"
         job.started_at=func.now()
         self.db.commit()
-        self.db.refresh(job)
         return job
 
     def mark_success(self,job:Job)->Job:
         job.status="SUCCESS"
         job.completed_at=func.now()
         self.db.commit()
-        self.db.refresh(job)
         return job
     
     def mark_failed(self,job:Job,error:Exception)->Job:
@@ -51,6 +226,34 @@ class JobRepository:
         else:
             job.status="PENDING"
         self.db.commit()
-        self.db.refresh(job)
         return job
 
+    def record_results(self,succeeded:list[UUID],failed:dict[UUID,str])->None:
+        """
+        Records the outcome of many finished jobs in one commit: one UPDATE
+        for all successes and one for all failures, which follow mark_failed
+        (back to PENDING until max_attempts, then FAILED). Rows are not
+        refreshed; jobs loaded in this session are simply expired.
+        """
+        if succeeded:
+            self.db.execute(
+                update(Job)
+                .where(Job.id.in_(succeeded))
+                .values(status="SUCCESS", completed_at=func.now())
+                .execution_options(synchronize_session=False)
+            )
+        if failed:
+            exhausted=Job.attempts+1>=Job.max_attempts
+            self.db.execute(
+                update(Job)
+                .where(Job.id.in_(list(failed)))
+                .values(
+                    attempts=Job.attempts+1,
+                    last_error=case(failed,value=Job.id),
+                    status=case((exhausted,"FAILED"),else_="PENDING"),
+                    completed_at=case((exhausted,func.now()),else_=Job.completed_at)
+                )
+                .execution_options(synchronize_session=False)
+            )
+        self.db.commit()
+
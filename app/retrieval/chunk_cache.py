@@ -0,0 +1,54 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from uuid import UUID
+
+from app.core.config import settings
+from app.repositories.document_chunk_repository import DocumentChunkRepository
+
+class CachedChunk:
+    def __init__(self, text: str, content_hash: str, token_count: int | None):
+        self.text = text
+        self.content_hash = content_hash
+        self.token_count = token_count
+
+
+class ChunkCache:
+    """
+    Process-wide LRU of chunk text keyed by chunk id. Chunk rows are immutable
+    once written, so entries never go stale; misses are fetched in one query.
+    """
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[UUID, CachedChunk] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_many(self, chunk_repo: DocumentChunkRepository, chunk_ids: list[UUID]) -> dict[UUID, CachedChunk]:
+        found, missing = {}, []
+        with self._lock:
+            for chunk_id in chunk_ids:
+                entry = self._entries.get(chunk_id)
+                if entry is None:
+                    missing.append(chunk_id)
+                else:
+                    self._entries.move_to_end(chunk_id)
+                    found[chunk_id] = entry
+
+        if missing:
+            loaded = {}
+            for chunk in chunk_repo.list_by_ids(missing):
+                loaded[chunk.id] = CachedChunk(
+                    chunk.text,
+                    chunk.content_hash or hashlib.sha256(chunk.text.encode("utf-8")).hexdigest(),
+                    chunk.token_count
+                )
+            found.update(loaded)
+            with self._lock:
+                self._entries.update(loaded)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+
+        return found
+
+
+chunk_cache = ChunkCache(settings.CHUNK_CACHE_SIZE)
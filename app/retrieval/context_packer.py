@@ -0,0 +1,78 @@
+from app.retrieval.tokenizer import estimate_tokens
+
+
+class PackedContext:
+    def __init__(self, text: str, stats: dict):
+        self.text = text
+        self.stats = stats
+
+
+def pack_context(documents: list[dict], token_budget: int) -> PackedContext:
+    """
+    Packs ranked chunks into a prompt context that fits `token_budget`.
+
+    `documents` is the run's context_documents list. Chunks are taken best
+    score first (document order when unscored), duplicates are dropped, and
+    the selection is rendered per document in chunk order with adjacent
+    chunks of the same version merged. When merging, the `overlap_chars` the
+    chunker recorded for the later chunk are dropped; chunks without it
+    (legacy slices, paragraph starts) are joined as they are.
+    """
+    candidates = []
+    for doc_position, doc in enumerate(documents):
+        for chunk in doc.get("chunks", []):
+            candidates.append((doc_position, doc, chunk))
+
+    ranked = sorted(
+        enumerate(candidates),
+        key=lambda item: (-(item[1][2].get("score") or 0.0), item[0])
+    )
+
+    seen_ids, seen_texts = set(), set()
+    selected = []
+    used_tokens = 0
+    dropped = 0
+    headers = set()
+    for _, (doc_position, doc, chunk) in ranked:
+        text = chunk.get("text") or ""
+        if chunk.get("chunk_id") in seen_ids or text in seen_texts:
+            continue
+        seen_ids.add(chunk.get("chunk_id"))
+        seen_texts.add(text)
+
+        cost = chunk.get("tokens") or estimate_tokens(text)
+        if doc_position not in headers:
+            cost += estimate_tokens(doc.get("document_title", "Untitled")) + 4
+        if used_tokens + cost > token_budget:
+            dropped += 1
+            continue
+
+        used_tokens += cost
+        headers.add(doc_position)
+        selected.append((doc_position, chunk.get("index", 0), doc, text, chunk.get("overlap_chars") or 0))
+
+    selected.sort(key=lambda item: (item[0], item[1]))
+
+    parts = []
+    merged = 0
+    previous = None
+    for doc_position, index, doc, text, overlap_chars in selected:
+        if previous and previous[0] == doc_position and previous[1] == index - 1:
+            # Adjacent chunk of the same version: stitch without repeating the overlap
+            parts.append(text[min(overlap_chars, len(text)):])
+            merged += 1
+        else:
+            parts.append(f"\n--- Document: {doc.get('document_title', 'Untitled')} ---\n")
+            parts.append(text)
+        previous = (doc_position, index)
+
+    return PackedContext(
+        "".join(parts),
+        {
+            "chunks": len(selected),
+            "merged": merged,
+            "dropped": dropped,
+            "estimated_tokens": used_tokens,
+            "token_budget": token_budget
+        }
+    )
@@ -0,0 +1,107 @@
+import hashlib
+import math
+from collections import Counter
+from abc import ABC, abstractmethod
+import numpy as np
+
+from app.core.config import settings
+from app.retrieval.tokenizer import QUESTION_STOPWORDS, STOPWORDS, tokenize
+
+class Embedder(ABC):
+    dim: int
+    # Whether a high cosine between two questions means they ask the same thing
+    semantic: bool = True
+
+    @abstractmethod
+    def embed(self, texts: list[str]) -> np.ndarray:
+        """
+        Returns a (len(texts), dim) float32 matrix of L2-normalised vectors.
+        """
+        pass
+
+    def embed_one(self, text: str) -> np.ndarray:
+        return self.embed([text])[0]
+
+    def embed_question(self, text: str) -> np.ndarray:
+        """
+        Embeds a question for comparison with other questions (answer cache keys).
+        """
+        return self.embed_one(text)
+
+
+def _normalize(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (matrix / norms).astype(np.float32)
+
+
+class HashingEmbedder(Embedder):
+    """
+    Offline embedder: signed feature hashing of unigrams and bigrams with
+    log-scaled term frequencies. No model download or network access needed,
+    deterministic across processes. Not semantic: questions that differ
+    only in a question word or a negation share almost every feature.
+    """
+    semantic = False
+
+    def __init__(self, dim: int = 1024):
+        self.dim = dim
+
+    def _bucket(self, feature: str) -> tuple[int, float]:
+        digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+        value = int.from_bytes(digest, "little")
+        sign = 1.0 if value & 1 else -1.0
+        return (value >> 1) % self.dim, sign
+
+    def embed(self, texts: list[str]) -> np.ndarray:
+        return self._embed(texts, STOPWORDS)
+
+    def embed_question(self, text: str) -> np.ndarray:
+        return self._embed([text], QUESTION_STOPWORDS)[0]
+
+    def _embed(self, texts: list[str], stopwords: frozenset[str]) -> np.ndarray:
+        matrix = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            tokens = [t for t in tokenize(text) if t not in stopwords]
+            counts = Counter(tokens)
+            counts.update(f"{a} {b}" for a, b in zip(tokens, tokens[1:]))
+            for feature, count in counts.items():
+                index, sign = self._bucket(feature)
+                matrix[row, index] += sign * (1.0 + math.log(count))
+        return _normalize(matrix)
+
+
+class OpenAIEmbedder(Embedder):
+    def __init__(self, model: str, dim: int = 1536):
+        from openai import OpenAI
+        self.client = OpenAI(api_key=settings.OPENAI_API_KEY)
+        self.model = model
+        self.dim = dim
+
+    def embed(self, texts: list[str]) -> np.ndarray:
+        if not texts:
+            return np.zeros((0, self.dim), dtype=np.float32)
+        response = self.client.embeddings.create(
+            model=self.model,
+            input=texts,
+            dimensions=self.dim
+        )
+        matrix = np.array([item.embedding for item in response.data], dtype=np.float32)
+        return _normalize(matrix)
+
+
+_embedder: Embedder | None = None
+
+def get_embedder() -> Embedder:
+    """
+    Returns the process-wide embedder selected by EMBEDDING_BACKEND.
+    """
+    global _embedder
+    if _embedder is None:
+        if settings.EMBEDDING_BACKEND == "hashing":
+            _embedder = HashingEmbedder(dim=settings.EMBEDDING_DIM)
+        elif settings.EMBEDDING_BACKEND == "openai":
+            _embedder = OpenAIEmbedder(model=settings.EMBEDDING_MODEL, dim=settings.EMBEDDING_DIM)
+        else:
+            raise ValueError(f"Unknown embedding backend: {settings.EMBEDDING_BACKEND}")
+    return _embedder
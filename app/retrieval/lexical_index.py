@@ -0,0 +1,536 @@
+import json
+import math
+import mmap
+import os
+import struct
+import uuid
+from collections import Counter
+from uuid import UUID
+import numpy as np
+
+from app.core.config import settings
+from app.retrieval.manifest import live_versions, load_manifest, manifest_lock, save_manifest, swap_segments
+from app.retrieval.segment_cache import SegmentCache
+from app.retrieval.tokenizer import tokenize
+from app.storage.local import LocalDiskStorage
+
+SEGMENT_MAGIC = b"BM25"
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Segment files are immutable once written, so mapped pages can be shared per process
+_segment_cache = SegmentCache(settings.INDEX_SEGMENT_CACHE_SIZE)
+
+
+def _id_array(chunk_ids: list[UUID]) -> np.ndarray:
+    return np.frombuffer(b"".join(c.bytes for c in chunk_ids), dtype=np.uint8).reshape(len(chunk_ids), 16)
+
+
+class LexicalSegment:
+    """
+    Read-only view over one segment file:
+
+        BM25 | uint32 header length | header JSON | postings
+             | chunk ids (16 bytes each) | doc lengths (uint32) [| row versions]
+             | forward row starts | forward term positions | forward frequencies
+
+    The header holds the term dictionary, mapping each term to (byte offset,
+    posting count). Postings for a term are `count` uint32 local doc ids
+    followed by `count` uint32 term frequencies. Chunk ids stay in the mapped
+    file and are only decoded for rows a search returns. Merged segments hold
+    rows of several versions and record each row's version, like vector
+    segments, so searches can mask out other or removed versions. The forward
+    block lists each row's terms (as positions in the term dictionary) and
+    frequencies, so a new version can copy the entries of unchanged chunks.
+    """
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mm[:4] != SEGMENT_MAGIC:
+            raise ValueError(f"Not a lexical segment: {path}")
+        (header_len,) = struct.unpack_from("<I", self._mm, 4)
+        header = json.loads(self._mm[8:8 + header_len])
+        self._base = 8 + header_len
+        self.versions = header.get("versions") or [header["version_id"]]
+        self.terms = header["terms"]
+        self.row_versions = None
+        self.forward = None
+        if "chunk_ids" in header:
+            # Written before the ids and lengths moved out of the header
+            self.chunk_ids = _id_array([UUID(c) for c in header["chunk_ids"]])
+            self.doc_lengths = np.asarray(header["doc_lengths"], dtype=np.float32)
+        else:
+            count = header["count"]
+            self.chunk_ids = np.frombuffer(
+                self._mm, dtype=np.uint8, count=count * 16, offset=self._base + header["chunk_ids_offset"]
+            ).reshape(count, 16)
+            self.doc_lengths = np.frombuffer(
+                self._mm, dtype="<u4", count=count, offset=self._base + header["doc_lengths_offset"]
+            ).astype(np.float32)
+            if "row_versions_offset" in header:
+                self.row_versions = np.frombuffer(
+                    self._mm, dtype="<u4", count=count, offset=self._base + header["row_versions_offset"]
+                )
+            if "forward_offset" in header:
+                starts = np.frombuffer(
+                    self._mm, dtype="<u4", count=count + 1, offset=self._base + header["forward_offset"]
+                )
+                total = int(starts[-1]) if count else 0
+                offset = self._base + header["forward_offset"] + 4 * (count + 1)
+                self.forward = (
+                    starts,
+                    np.frombuffer(self._mm, dtype="<u4", count=total, offset=offset),
+                    np.frombuffer(self._mm, dtype="<u4", count=total, offset=offset + 4 * total)
+                )
+        self._term_names: list[str] | None = None
+        self.count = len(self.doc_lengths)
+        self.total_length = int(self.doc_lengths.sum())
+
+    def chunk_id(self, row: int) -> UUID:
+        return UUID(bytes=self.chunk_ids[row].tobytes())
+
+    def find_rows(self, version_id: str, chunk_ids: list[UUID]) -> dict[UUID, int]:
+        """
+        Maps the given chunks of a version to their rows; only that version's rows are decoded.
+        """
+        mask = self.live_mask({version_id})
+        rows = np.arange(self.count) if mask is None else np.flatnonzero(mask)
+        wanted = {chunk_id.bytes: chunk_id for chunk_id in chunk_ids}
+        ids = self.chunk_ids[rows].tobytes()
+        found = {}
+        for i, row in enumerate(rows):
+            chunk_id = wanted.get(ids[16 * i:16 * i + 16])
+            if chunk_id is not None:
+                found[chunk_id] = int(row)
+        return found
+
+    def term_counts(self, row: int) -> dict[str, int] | None:
+        """
+        Term frequencies of one row, read from the forward block.
+        None for segments written without one.
+        """
+        if self.forward is None:
+            return None
+        if self._term_names is None:
+            self._term_names = list(self.terms)
+        starts, positions, freqs = self.forward
+        start, end = int(starts[row]), int(starts[row + 1])
+        return {self._term_names[p]: int(f) for p, f in zip(positions[start:end], freqs[start:end])}
+
+    def df(self, term: str) -> int:
+        entry = self.terms.get(term)
+        return entry[1] if entry else 0
+
+    def postings(self, term: str) -> tuple[np.ndarray, np.ndarray] | None:
+        entry = self.terms.get(term)
+        if entry is None:
+            return None
+        offset, count = entry
+        start = self._base + offset
+        doc_ids = np.frombuffer(self._mm, dtype="<u4", count=count, offset=start)
+        freqs = np.frombuffer(self._mm, dtype="<u4", count=count, offset=start + 4 * count)
+        return doc_ids, freqs
+
+    def all_postings(self) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Every posting of the segment as flat (term position in self.terms,
+        doc id, frequency) arrays, read in one pass.
+        """
+        entries = np.asarray(list(self.terms.values()), dtype=np.int64).reshape(-1, 2)
+        counts = entries[:, 1]
+        total = int(counts.sum())
+        words = np.frombuffer(self._mm, dtype="<u4", count=2 * total, offset=self._base)
+        term_ids = np.repeat(np.arange(len(counts)), counts)
+        within = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+        doc_positions = np.repeat(entries[:, 0] // 4, counts) + within
+        return term_ids, words[doc_positions].astype(np.int64), words[doc_positions + np.repeat(counts, counts)]
+
+    def live_mask(self, allowed_versions: set[str]) -> np.ndarray | None:
+        """
+        Boolean mask of rows belonging to allowed_versions, or None when every row does.
+        """
+        if allowed_versions.issuperset(self.versions):
+            return None
+        allowed = [i for i, version_id in enumerate(self.versions) if version_id in allowed_versions]
+        if self.row_versions is None:
+            return np.full(self.count, bool(allowed))
+        return np.isin(self.row_versions, allowed)
+
+
+def _write_postings(
+    path: str,
+    versions: list[str],
+    row_versions: np.ndarray | None,
+    chunk_ids: np.ndarray,
+    doc_lengths: np.ndarray,
+    terms: list[str],
+    term_ids: np.ndarray,
+    doc_ids: np.ndarray,
+    freqs: np.ndarray
+) -> None:
+    """
+    Writes a segment from flat postings: posting i is (terms[term_ids[i]],
+    doc_ids[i], freqs[i]), sorted by term then doc id, with terms sorted.
+    row_versions indexes into versions and is only stored when there are several.
+    """
+    counts = np.bincount(term_ids, minlength=len(terms))
+    starts = np.cumsum(counts) - counts
+    # Each term's block is its doc ids followed by its frequencies
+    within = np.arange(len(doc_ids)) - starts[term_ids]
+    postings = np.empty(2 * len(doc_ids), dtype="<u4")
+    postings[2 * starts[term_ids] + within] = doc_ids
+    postings[2 * starts[term_ids] + counts[term_ids] + within] = freqs
+
+    header = {
+        "versions": versions,
+        "count": len(chunk_ids),
+        "terms": {term: [8 * int(start), int(count)] for term, start, count in zip(terms, starts, counts)}
+    }
+    body = bytearray(postings.tobytes())
+    header["chunk_ids_offset"] = len(body)
+    body += np.ascontiguousarray(chunk_ids, dtype=np.uint8).tobytes()
+    header["doc_lengths_offset"] = len(body)
+    body += np.asarray(doc_lengths, dtype="<u4").tobytes()
+    if len(versions) > 1:
+        header["row_versions_offset"] = len(body)
+        body += np.asarray(row_versions, dtype="<u4").tobytes()
+    # Forward block: the same postings ordered by doc id
+    by_doc = np.lexsort((term_ids, doc_ids))
+    row_starts = np.zeros(len(chunk_ids) + 1, dtype="<u4")
+    row_starts[1:] = np.cumsum(np.bincount(doc_ids, minlength=len(chunk_ids)))
+    header["forward_offset"] = len(body)
+    body += row_starts.tobytes()
+    body += np.asarray(term_ids[by_doc], dtype="<u4").tobytes()
+    body += np.asarray(freqs[by_doc], dtype="<u4").tobytes()
+
+    # Padded so the postings start 8-byte aligned
+    encoded = json.dumps(header).encode("utf-8")
+    encoded = encoded.ljust(len(encoded) + (-len(encoded) % 8))
+
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(SEGMENT_MAGIC)
+        f.write(struct.pack("<I", len(encoded)))
+        f.write(encoded)
+        f.write(body)
+    os.replace(tmp_path, path)
+
+
+def write_segment(
+    path: str,
+    version_id: UUID,
+    chunk_ids: list[UUID],
+    texts: list[str],
+    term_counts: list[dict[str, int] | None] | None = None
+) -> None:
+    """
+    Builds a segment file for a batch of chunks of one version. Chunks with
+    known term counts (copied from an earlier segment) are not re-tokenized.
+    """
+    posting_terms, doc_ids, freqs, doc_lengths = [], [], [], []
+    for doc_id, text in enumerate(texts):
+        counts = term_counts[doc_id] if term_counts else None
+        if counts is None:
+            counts = Counter(tokenize(text))
+        doc_lengths.append(sum(counts.values()))
+        for term, freq in counts.items():
+            posting_terms.append(term)
+            doc_ids.append(doc_id)
+            freqs.append(freq)
+
+    terms = sorted(set(posting_terms))
+    positions = {term: i for i, term in enumerate(terms)}
+    term_ids = np.asarray([positions[term] for term in posting_terms], dtype=np.int64)
+    # Stable, so doc ids stay ascending within each term
+    order = np.argsort(term_ids, kind="stable")
+    _write_postings(
+        path, [str(version_id)], None, _id_array(chunk_ids), np.asarray(doc_lengths),
+        terms, term_ids[order], np.asarray(doc_ids, dtype=np.int64)[order], np.asarray(freqs, dtype=np.int64)[order]
+    )
+
+
+def merge_segments(path: str, parts: list[tuple[LexicalSegment, np.ndarray]]) -> None:
+    """
+    Writes one segment holding the given rows of several segments, in order,
+    remapping their postings in bulk rather than term by term.
+    """
+    terms = sorted(set().union(*(segment.terms for segment, _ in parts)))
+    positions = {term: i for i, term in enumerate(terms)}
+    versions: dict[str, int] = {}
+    row_versions, chunk_ids, doc_lengths = [], [], []
+    term_ids, doc_ids, freqs = [], [], []
+    base = 0
+    for segment, rows in parts:
+        local = np.asarray([versions.setdefault(v, len(versions)) for v in segment.versions], dtype=np.int64)
+        own = np.zeros(segment.count, dtype=np.int64) if segment.row_versions is None else segment.row_versions
+        row_versions.append(local[own[rows]])
+        chunk_ids.append(segment.chunk_ids[rows])
+        doc_lengths.append(segment.doc_lengths[rows])
+
+        new_rows = np.full(segment.count, -1, dtype=np.int64)
+        new_rows[rows] = np.arange(base, base + len(rows))
+        segment_terms, segment_docs, segment_freqs = segment.all_postings()
+        mapped = new_rows[segment_docs]
+        keep = mapped >= 0
+        to_merged = np.asarray([positions[term] for term in segment.terms], dtype=np.int64)
+        term_ids.append(to_merged[segment_terms[keep]])
+        doc_ids.append(mapped[keep])
+        freqs.append(segment_freqs[keep])
+        base += len(rows)
+
+    term_ids, doc_ids, freqs = np.concatenate(term_ids), np.concatenate(doc_ids), np.concatenate(freqs)
+    order = np.lexsort((doc_ids, term_ids))
+    # Terms whose postings all belonged to dropped rows are left out
+    used, term_ids = np.unique(term_ids[order], return_inverse=True)
+    _write_postings(
+        path,
+        list(versions),
+        np.concatenate(row_versions),
+        np.concatenate(chunk_ids),
+        np.concatenate(doc_lengths),
+        [terms[i] for i in used],
+        term_ids,
+        doc_ids[order],
+        freqs[order]
+    )
+
+
+class LexicalIndex:
+    """
+    Per-project BM25 inverted index under storage_data/indexes/{project_id}/lexical.
+    Each ingested DocumentVersion adds immutable segment files and the manifest
+    only lists them per version. Small segments are merged in tiers like
+    vector segments (see compact), so a query visits a number of segments
+    logarithmic in the project size. Corpus statistics for IDF are summed
+    over the segments at query time, for the query terms only; postings are
+    read only from segments holding the requested versions.
+    """
+    def __init__(self, project_id: UUID, storage: LocalDiskStorage | None = None):
+        storage = storage or LocalDiskStorage()
+        self.dir = os.path.join(storage.base_path, "indexes", str(project_id), "lexical")
+        self.manifest_path = os.path.join(self.dir, "manifest.json")
+
+    def _load_manifest(self) -> dict:
+        return load_manifest(self.manifest_path)
+
+    def _save_manifest(self, manifest: dict) -> None:
+        save_manifest(self.manifest_path, manifest)
+
+    def _locked(self):
+        # Every manifest update is load -> modify -> save under this lock
+        return manifest_lock(self.manifest_path)
+
+    def _segment(self, name: str) -> LexicalSegment:
+        return _segment_cache.get(os.path.join(self.dir, name), LexicalSegment)
+
+    def _delete_segments(self, names) -> None:
+        for name in names:
+            path = os.path.join(self.dir, name)
+            _segment_cache.discard(path)
+            if os.path.exists(path):
+                os.remove(path)
+
+    def get_term_counts(self, version_id: UUID, chunk_ids: list[UUID]) -> dict[UUID, dict[str, int]]:
+        """
+        Returns the indexed term frequencies of the given chunks of a version.
+        Chunks that are not indexed, or only in segments without a forward
+        block, are left out.
+        """
+        manifest = self._load_manifest()
+        found = {}
+        for name in manifest["versions"].get(str(version_id), []):
+            missing = [chunk_id for chunk_id in chunk_ids if chunk_id not in found]
+            if not missing:
+                break
+            segment = self._segment(name)
+            if segment.forward is None:
+                continue
+            for chunk_id, row in segment.find_rows(str(version_id), missing).items():
+                found[chunk_id] = segment.term_counts(row)
+        return found
+
+    def add_version(self, version_id: UUID, chunk_ids: list[UUID], texts: list[str]) -> None:
+        """
+        Indexes the chunks of one document version, replacing any previous segments for it.
+        """
+        self.remove_version(version_id)
+        self.append_segment(version_id, chunk_ids, texts)
+
+    def append_segment(self, version_id: UUID, chunk_ids: list[UUID], texts: list[str]) -> None:
+        """
+        Adds one more segment for a version without rewriting existing ones,
+        then merges small segments if a size tier is full.
+        """
+        name = self.write_pending(version_id, chunk_ids, texts)
+        if name:
+            self.publish(version_id, [name])
+
+    def write_pending(
+        self,
+        version_id: UUID,
+        chunk_ids: list[UUID],
+        texts: list[str],
+        term_counts: list[dict[str, int] | None] | None = None
+    ) -> str | None:
+        """
+        Writes a segment for a version without listing it in the manifest, so
+        searches don't see it until publish. Returns its name.
+        """
+        if not chunk_ids:
+            return None
+        os.makedirs(self.dir, exist_ok=True)
+        # Never reused, so no process can serve a stale mapping under this name
+        name = f"{version_id}-{uuid.uuid4().hex[:12]}.seg"
+        write_segment(os.path.join(self.dir, name), version_id, chunk_ids, texts, term_counts)
+        return name
+
+    def publish(self, version_id: UUID, names: list[str]) -> None:
+        """
+        Lists segments written by write_pending under their version, then
+        merges small segments if a size tier is full.
+        """
+        if not names:
+            return
+        with self._locked():
+            manifest = self._load_manifest()
+            manifest["versions"].setdefault(str(version_id), []).extend(names)
+            self._save_manifest(manifest)
+        self.compact()
+
+    def discard(self, names: list[str]) -> None:
+        """
+        Deletes segments written by write_pending that will not be published.
+        """
+        self._delete_segments(names)
+
+    def compact(self) -> None:
+        """
+        Tiered merging, as VectorIndex.compact: once LEXICAL_MERGE_FACTOR
+        segments of similar row counts exist they are rewritten as one,
+        keeping only rows of versions still in the manifest. Merges are
+        written outside the manifest lock and swapped in under it only if
+        all their inputs are still listed.
+        """
+        factor = settings.LEXICAL_MERGE_FACTOR
+        while True:
+            manifest = self._load_manifest()
+            live = live_versions(manifest)
+            tiers: dict[int, list[str]] = {}
+            for name in live:
+                try:
+                    rows = self._segment(name).count
+                except FileNotFoundError:
+                    # Deleted since the manifest was read
+                    continue
+                if rows < settings.LEXICAL_MERGE_MAX_ROWS:
+                    tiers.setdefault(int(math.log(max(rows, 1), factor)), []).append(name)
+            full = [names for _, names in sorted(tiers.items()) if len(names) >= factor]
+            if not full:
+                return
+            self._merge(live, full[0])
+
+    def _merge(self, live: dict[str, set[str]], names: list[str]) -> None:
+        parts = []
+        for name in names:
+            try:
+                segment = self._segment(name)
+            except FileNotFoundError:
+                return
+            mask = segment.live_mask(live[name])
+            parts.append((segment, np.arange(segment.count) if mask is None else np.flatnonzero(mask)))
+
+        merged = f"merged-{uuid.uuid4().hex}.seg"
+        merge_segments(os.path.join(self.dir, merged), parts)
+
+        with self._locked():
+            manifest = self._load_manifest()
+            # Versions removed meanwhile are not in the manifest, so their rows stay masked
+            if not swap_segments(manifest, set(names), merged):
+                self._delete_segments([merged])
+                return
+            self._save_manifest(manifest)
+        self._delete_segments(names)
+
+    def remove_version(self, version_id: UUID) -> None:
+        """
+        Drops a version from the index. Segments only it used are deleted;
+        its rows in merged segments are masked out until the next merge.
+        """
+        with self._locked():
+            manifest = self._load_manifest()
+            names = manifest["versions"].pop(str(version_id), None)
+            if not names:
+                return
+            self._save_manifest(manifest)
+        still_used = live_versions(manifest)
+        self._delete_segments([name for name in names if name not in still_used])
+
+    def search(
+        self,
+        query: str,
+        top_k: int,
+        version_ids: list[UUID] | None = None
+    ) -> list[tuple[UUID, float]]:
+        """
+        Returns up to top_k (chunk_id, BM25 score) pairs, best first.
+        Only the postings of the query terms are read, never the chunk rows.
+        Rows of removed versions still count toward the corpus statistics
+        until their segment is next merged.
+        """
+        manifest = self._load_manifest()
+        segments = {}
+        for name, versions in live_versions(manifest).items():
+            try:
+                segments[name] = (self._segment(name), versions)
+            except FileNotFoundError:
+                # Merged away since the manifest was read
+                continue
+        doc_count = sum(segment.count for segment, _ in segments.values())
+        if not doc_count:
+            return []
+
+        # IDF stays project-wide even when the search is restricted to some versions
+        terms = set(tokenize(query))
+        avg_length = sum(segment.total_length for segment, _ in segments.values()) / doc_count
+        idf = {}
+        for term in terms:
+            df = sum(segment.df(term) for segment, _ in segments.values())
+            if df:
+                idf[term] = math.log(1 + (doc_count - df + 0.5) / (df + 0.5))
+        if not idf:
+            return []
+
+        wanted = None if version_ids is None else {str(v) for v in version_ids}
+        results = []
+        for segment, versions in segments.values():
+            allowed = versions if wanted is None else versions & wanted
+            if not allowed:
+                continue
+            mask = segment.live_mask(allowed)
+            doc_parts, score_parts = [], []
+            for term, weight in idf.items():
+                hit = segment.postings(term)
+                if hit is None:
+                    continue
+                doc_ids, freqs = hit
+                if mask is not None:
+                    keep = mask[doc_ids]
+                    doc_ids, freqs = doc_ids[keep], freqs[keep]
+                    if not doc_ids.size:
+                        continue
+                tf = freqs.astype(np.float32)
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * segment.doc_lengths[doc_ids] / avg_length)
+                doc_parts.append(doc_ids)
+                score_parts.append(weight * tf * (BM25_K1 + 1) / (tf + norm))
+            if not doc_parts:
+                continue
+
+            # Sum per-term contributions per doc without allocating a dense score array
+            docs, inverse = np.unique(np.concatenate(doc_parts), return_inverse=True)
+            scores = np.bincount(inverse, weights=np.concatenate(score_parts))
+            k = min(top_k, scores.size)
+            best = np.argpartition(-scores, k - 1)[:k]
+            results.extend((segment, docs[i], float(scores[i])) for i in best)
+
+        results.sort(key=lambda item: item[2], reverse=True)
+        return [(segment.chunk_id(row), score) for segment, row, score in results[:top_k]]
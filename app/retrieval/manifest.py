@@ -0,0 +1,71 @@
+import fcntl
+import json
+import os
+import tempfile
+from contextlib import contextmanager
+
+
+def load_manifest(path: str) -> dict:
+    if not os.path.exists(path):
+        return {"versions": {}}
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def save_manifest(path: str, manifest: dict) -> None:
+    """
+    Replaces the manifest atomically. The temp file has a unique name, so
+    concurrent writers never share one.
+    """
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            f.write(json.dumps(manifest))
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+@contextmanager
+def manifest_lock(path: str):
+    """
+    Exclusive flock held around a manifest's load -> modify -> save. Works
+    across processes and threads, since each holder opens its own lock file
+    description. Readers don't take it: saves are atomic renames.
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path + ".lock", "a") as f:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+def live_versions(manifest: dict) -> dict[str, set[str]]:
+    """
+    Maps each segment named in the manifest to the versions that still use it.
+    """
+    live: dict[str, set[str]] = {}
+    for version_id, names in manifest["versions"].items():
+        for name in names:
+            live.setdefault(name, set()).add(version_id)
+    return live
+
+
+def swap_segments(manifest: dict, replaced: set[str], merged: str) -> bool:
+    """
+    Points every version that used one of `replaced` at `merged` instead.
+    Returns False, leaving the manifest as it was, if any of them is no
+    longer listed (another merge or a removal got there first).
+    """
+    if not replaced.issubset(live_versions(manifest)):
+        return False
+    for version_id, segments in manifest["versions"].items():
+        if replaced.intersection(segments):
+            manifest["versions"][version_id] = [n for n in segments if n not in replaced] + [merged]
+    return True
@@ -0,0 +1,139 @@
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from uuid import UUID
+
+from app.core.config import settings
+from app.models.document_chunk import DocumentChunk
+from app.repositories.document_chunk_repository import DocumentChunkRepository
+from app.retrieval.embedder import get_embedder
+from app.retrieval.lexical_index import LexicalIndex
+from app.retrieval.tokenizer import STOPWORDS, tokenize
+from app.retrieval.vector_index import VectorIndex
+
+RRF_K = 60
+
+# Shared by all pipelines in the process; each run submits one lexical and one vector task
+_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="retrieval")
+
+
+def _elapsed_ms(start: float) -> float:
+    return round((time.perf_counter() - start) * 1000, 2)
+
+
+def reciprocal_rank_fusion(rankings: list[list[tuple[UUID, float]]], k: int = RRF_K) -> list[tuple[UUID, float]]:
+    """
+    Fuses several ranked lists: score(d) = sum over lists of 1 / (k + rank(d)).
+    """
+    fused: dict[UUID, float] = {}
+    for ranking in rankings:
+        for rank, (chunk_id, _) in enumerate(ranking, start=1):
+            fused[chunk_id] = fused.get(chunk_id, 0.0) + 1.0 / (k + rank)
+    return sorted(fused.items(), key=lambda item: item[1], reverse=True)
+
+
+class Reranker(ABC):
+    @abstractmethod
+    def rerank(self, question: str, candidates: list[tuple[DocumentChunk, float]]) -> list[tuple[UUID, float]]:
+        """
+        Re-scores a (chunk, fused score) shortlist. Returns (chunk_id, score) best first.
+        """
+        pass
+
+
+class TermCoverageReranker(Reranker):
+    """
+    Cheap local reranker: prefers chunks covering more of the distinct question
+    terms, using the fused score as a tie-breaker.
+    """
+    def rerank(self, question: str, candidates: list[tuple[DocumentChunk, float]]) -> list[tuple[UUID, float]]:
+        terms = {t for t in tokenize(question) if t not in STOPWORDS}
+        scored = []
+        for chunk, fused_score in candidates:
+            coverage = len(terms.intersection(tokenize(chunk.text))) / len(terms) if terms else 0.0
+            scored.append((chunk.id, coverage + fused_score))
+        scored.sort(key=lambda item: item[1], reverse=True)
+        return scored
+
+
+class RetrievalResult:
+    """
+    Ranked hits plus their chunk rows. Every hit has a row in `chunks`: index
+    entries whose row is missing (ingest not committed yet, or left behind
+    by a failed one) are dropped and counted in stats["unresolved"].
+    """
+    def __init__(self, hits: list[tuple[UUID, float]], chunks: dict[UUID, DocumentChunk], stats: dict):
+        self.hits = hits
+        self.chunks = chunks
+        self.stats = stats
+
+
+class RetrievalPipeline:
+    """
+    Hybrid retrieval: BM25 and vector candidates generated concurrently,
+    fused with reciprocal rank fusion, then an optional rerank over a bounded
+    shortlist. Records latency and candidate counts for every stage.
+    """
+    def __init__(
+        self,
+        project_id: UUID,
+        chunk_repo: DocumentChunkRepository,
+        reranker: Reranker | None = None
+    ):
+        self.project_id = project_id
+        self.chunk_repo = chunk_repo
+        self.reranker = reranker or TermCoverageReranker()
+
+    def _lexical(self, question: str, version_ids: list[UUID], candidate_k: int):
+        start = time.perf_counter()
+        hits = LexicalIndex(self.project_id).search(question, candidate_k, version_ids=version_ids)
+        return hits, {"ms": _elapsed_ms(start), "candidates": len(hits)}
+
+    def _vector(self, question: str, version_ids: list[UUID], candidate_k: int):
+        start = time.perf_counter()
+        query_vector = get_embedder().embed_one(question)
+        hits = VectorIndex(self.project_id).search(query_vector, candidate_k, version_ids=version_ids)
+        return hits, {"ms": _elapsed_ms(start), "candidates": len(hits)}
+
+    def run(
+        self,
+        question: str,
+        version_ids: list[UUID],
+        top_k: int,
+        candidate_k: int | None = None,
+        rerank: bool | None = None,
+        rerank_depth: int | None = None
+    ) -> RetrievalResult:
+        candidate_k = candidate_k or settings.RETRIEVAL_CANDIDATES
+        rerank = settings.RETRIEVAL_RERANK if rerank is None else rerank
+        rerank_depth = rerank_depth or settings.RETRIEVAL_RERANK_DEPTH
+        started = time.perf_counter()
+        stats = {}
+
+        lexical_future = _executor.submit(self._lexical, question, version_ids, candidate_k)
+        vector_future = _executor.submit(self._vector, question, version_ids, candidate_k)
+        lexical_hits, stats["lexical"] = lexical_future.result()
+        vector_hits, stats["vector"] = vector_future.result()
+
+        start = time.perf_counter()
+        fused = reciprocal_rank_fusion([lexical_hits, vector_hits])
+        stats["fusion"] = {"ms": _elapsed_ms(start), "candidates": len(fused)}
+
+        if rerank and fused:
+            start = time.perf_counter()
+            shortlist = fused[:max(rerank_depth, top_k)]
+            chunks = {c.id: c for c in self.chunk_repo.list_by_ids([chunk_id for chunk_id, _ in shortlist])}
+            candidates = [(chunks[chunk_id], score) for chunk_id, score in shortlist if chunk_id in chunks]
+            hits = self.reranker.rerank(question, candidates)[:top_k]
+            unresolved = len(shortlist) - len(candidates)
+            stats["rerank"] = {"ms": _elapsed_ms(start), "candidates": len(candidates)}
+        else:
+            hits = fused[:top_k]
+            chunks = {c.id: c for c in self.chunk_repo.list_by_ids([chunk_id for chunk_id, _ in hits])}
+            unresolved = sum(chunk_id not in chunks for chunk_id, _ in hits)
+
+        resolved = [(chunk_id, score) for chunk_id, score in hits if chunk_id in chunks]
+        stats["unresolved"] = unresolved
+        stats["total_ms"] = _elapsed_ms(started)
+        stats["returned"] = len(resolved)
+        return RetrievalResult(resolved, {chunk_id: chunks[chunk_id] for chunk_id, _ in resolved}, stats)
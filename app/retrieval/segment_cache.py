@@ -0,0 +1,37 @@
+import threading
+from collections import OrderedDict
+from typing import Callable
+
+
+class SegmentCache:
+    """
+    Process-wide LRU of open, memory-mapped segment views keyed by file path.
+    Segment files are immutable and their names are never reused, so an entry
+    can only be evicted or dropped with its file, never become stale. Evicted
+    views are not closed explicitly: a search still holding one keeps its
+    mapping alive until it finishes.
+    """
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, object] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, path: str, load: Callable[[str], object]):
+        with self._lock:
+            segment = self._entries.get(path)
+            if segment is not None:
+                self._entries.move_to_end(path)
+                return segment
+
+        # Opened outside the lock; if two threads race, both views are valid
+        segment = load(path)
+        with self._lock:
+            segment = self._entries.setdefault(path, segment)
+            self._entries.move_to_end(path)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return segment
+
+    def discard(self, path: str) -> None:
+        with self._lock:
+            self._entries.pop(path, None)
@@ -0,0 +1,28 @@
+import math
+import re
+
+# Keeps identifiers like part numbers ("AB-1234", "v2.1") together as one token
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[-_.][a-z0-9]+)*")
+
+# Function words that carry no topical signal for the dense embedder
+STOPWORDS = frozenset(
+    "a an and are as at be but by for from has have he her his i if in is it its "
+    "me my no not of on or our she so that the their them they this to was we were "
+    "what when where which who why will with you your".split()
+)
+
+# Question words and negation decide what a question asks, so question embeddings keep them
+QUESTION_STOPWORDS = STOPWORDS - {"no", "not", "what", "when", "where", "which", "who", "why"}
+
+def tokenize(text: str) -> list[str]:
+    """
+    Lower-cases text and splits it into word / identifier tokens.
+    Shared by the embedder and the lexical index so both see the same terms.
+    """
+    return TOKEN_PATTERN.findall(text.lower())
+
+def estimate_tokens(text: str) -> int:
+    """
+    Cheap model-agnostic token estimate (~4 characters per token for English).
+    """
+    return max(1, math.ceil(len(text) / 4))
@@ -0,0 +1,522 @@
+import json
+import math
+import mmap
+import os
+import struct
+import uuid
+from uuid import UUID
+import numpy as np
+
+from app.core.config import settings
+from app.retrieval.manifest import live_versions, load_manifest, manifest_lock, save_manifest, swap_segments
+from app.retrieval.segment_cache import SegmentCache
+from app.storage.local import LocalDiskStorage
+
+SEGMENT_MAGIC = b"VSEG"
+SEGMENT_ALIGN = 64
+KMEANS_ITERATIONS = 8
+KMEANS_SAMPLE = 20000
+
+# Segment files are immutable once written, so mapped pages can be shared per process
+_segment_cache = SegmentCache(settings.INDEX_SEGMENT_CACHE_SIZE)
+
+
+def _aligned(offset: int) -> int:
+    return (offset + SEGMENT_ALIGN - 1) // SEGMENT_ALIGN * SEGMENT_ALIGN
+
+
+def _id_array(chunk_ids: list[UUID]) -> np.ndarray:
+    return np.frombuffer(b"".join(c.bytes for c in chunk_ids), dtype=np.uint8).reshape(len(chunk_ids), 16)
+
+
+def _train_centroids(vectors: np.ndarray, nlist: int) -> np.ndarray:
+    """
+    Spherical k-means on a sample of the segment's vectors.
+    """
+    rng = np.random.default_rng(0)
+    sample = vectors
+    if len(vectors) > KMEANS_SAMPLE:
+        sample = vectors[rng.choice(len(vectors), KMEANS_SAMPLE, replace=False)]
+    centroids = sample[rng.choice(len(sample), nlist, replace=False)].copy()
+    for _ in range(KMEANS_ITERATIONS):
+        assignments = np.argmax(sample @ centroids.T, axis=1)
+        for c in range(nlist):
+            members = sample[assignments == c]
+            if len(members):
+                centroid = members.sum(axis=0)
+                norm = np.linalg.norm(centroid)
+                centroids[c] = centroid / norm if norm else centroid
+    return centroids.astype(np.float32)
+
+
+class VectorSegment:
+    """
+    Read-only, memory-mapped view over one IVF segment file:
+
+        VSEG | uint32 header length | header JSON | centroids
+             | [scales + codes (int8) |] vectors (float32)
+             | chunk ids (16 bytes each) [| row versions]
+
+    Vectors are stored grouped by inverted list, so probing a list reads one
+    contiguous slice. Segments below VECTOR_IVF_MIN_ROWS hold a single list
+    and are scanned exactly. Int8 segments add per-dimension scales and int8
+    codes, a quarter of the float32 size: the candidate scan is an integer
+    dot product over the codes against an int8-quantized query, and only the
+    shortlist's float32 rows are read to re-score it exactly. The float rows
+    of the other candidates are never touched, so they stay out of memory
+    unless something else reads them. Merged segments hold rows of
+    several versions and record each row's version, so searches restricted
+    to some versions (or skipping removed ones) can mask the others out.
+    Chunk ids stay in the mapped file, shared between processes, and are
+    only decoded for rows a search returns.
+    """
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mm[:4] != SEGMENT_MAGIC:
+            raise ValueError(f"Not a vector segment: {path}")
+        (header_len,) = struct.unpack_from("<I", self._mm, 4)
+        header = json.loads(self._mm[8:8 + header_len])
+        self.versions = header.get("versions") or [header["version_id"]]
+        self.list_offsets = header["list_offsets"]
+        if "chunk_ids" in header:
+            # Written before the ids moved out of the header
+            self.chunk_ids = _id_array([UUID(c) for c in header["chunk_ids"]])
+        else:
+            self.chunk_ids = np.frombuffer(
+                self._mm, dtype=np.uint8, count=header["count"] * 16, offset=header["chunk_ids_offset"]
+            ).reshape(header["count"], 16)
+        self.count = len(self.chunk_ids)
+        dim, count, nlist = header["dim"], self.count, len(self.list_offsets) - 1
+        self.centroids = np.frombuffer(
+            self._mm, dtype="<f4", count=nlist * dim, offset=header["centroids_offset"]
+        ).reshape(nlist, dim)
+        self.quantization = header.get("quantization", "none")
+        if self.quantization == "int8":
+            self.scales = np.frombuffer(self._mm, dtype="<f4", count=dim, offset=header["scales_offset"])
+            self.codes = np.frombuffer(
+                self._mm, dtype=np.int8, count=count * dim, offset=header["codes_offset"]
+            ).reshape(count, dim)
+        # Int8 segments written without float rows can only re-score against the codes
+        self.vectors = None
+        if "vectors_offset" in header:
+            self.vectors = np.frombuffer(
+                self._mm, dtype="<f4", count=count * dim, offset=header["vectors_offset"]
+            ).reshape(count, dim)
+        self.row_versions = None
+        if "row_versions_offset" in header:
+            self.row_versions = np.frombuffer(
+                self._mm, dtype="<u4", count=count, offset=header["row_versions_offset"]
+            )
+
+    def chunk_id(self, row: int) -> UUID:
+        return UUID(bytes=self.chunk_ids[row].tobytes())
+
+    def find_rows(self, version_id: str, chunk_ids: list[UUID]) -> dict[UUID, int]:
+        """
+        Maps the given chunks of a version to their rows; only that version's rows are decoded.
+        """
+        mask = self.live_mask({version_id})
+        rows = np.arange(self.count) if mask is None else np.flatnonzero(mask)
+        wanted = {chunk_id.bytes: chunk_id for chunk_id in chunk_ids}
+        ids = self.chunk_ids[rows].tobytes()
+        found = {}
+        for i, row in enumerate(rows):
+            chunk_id = wanted.get(ids[16 * i:16 * i + 16])
+            if chunk_id is not None:
+                found[chunk_id] = int(row)
+        return found
+
+    def version_of_rows(self) -> list[str]:
+        if self.row_versions is None:
+            return [self.versions[0]] * self.count
+        return [self.versions[i] for i in self.row_versions]
+
+    def dense(self, rows: np.ndarray) -> np.ndarray:
+        """
+        Stored float32 vectors of the given rows.
+        """
+        if self.vectors is None:
+            return self.codes[rows].astype(np.float32) * self.scales
+        return self.vectors[rows]
+
+    def live_mask(self, allowed_versions: set[str]) -> np.ndarray | None:
+        """
+        Boolean mask of rows belonging to allowed_versions, or None when every row does.
+        """
+        if allowed_versions.issuperset(self.versions):
+            return None
+        allowed = [i for i, version_id in enumerate(self.versions) if version_id in allowed_versions]
+        if self.row_versions is None:
+            return np.full(self.count, bool(allowed))
+        return np.isin(self.row_versions, allowed)
+
+    def search(
+        self,
+        query_vector: np.ndarray,
+        top_k: int,
+        nprobe: int,
+        rescore_factor: int = 4,
+        allowed_versions: set[str] | None = None
+    ) -> list[tuple[UUID, float]]:
+        nlist = len(self.list_offsets) - 1
+        if nlist <= 1:
+            ranges = [(0, self.count)]
+        else:
+            probes = np.argsort(-(self.centroids @ query_vector))[:nprobe]
+            ranges = [(self.list_offsets[p], self.list_offsets[p + 1]) for p in probes]
+
+        quantized = self.quantization == "int8"
+        if quantized:
+            # codes . (query * scales) is the dequantized dot product; quantizing that
+            # query too lets the scan run on int8 with int32 accumulation, no float copy
+            scaled_query = query_vector * self.scales
+            query_scale = float(np.abs(scaled_query).max()) / 127.0 or 1.0
+            query_codes = np.rint(scaled_query / query_scale).astype(np.int8)
+
+        rows, scores = [], []
+        for start, end in ranges:
+            if end > start:
+                rows.append(np.arange(start, end))
+                if quantized:
+                    scores.append(np.einsum("ij,j->i", self.codes[start:end], query_codes, dtype=np.int32))
+                else:
+                    scores.append(self.vectors[start:end] @ query_vector)
+        if not rows:
+            return []
+
+        rows, scores = np.concatenate(rows), np.concatenate(scores)
+        mask = None if allowed_versions is None else self.live_mask(allowed_versions)
+        if mask is not None:
+            keep = mask[rows]
+            rows, scores = rows[keep], scores[keep]
+            if not rows.size:
+                return []
+        if quantized:
+            # Integer scan picked the shortlist; re-score it against its full-precision rows
+            k = min(top_k * rescore_factor, scores.size)
+            rows = np.sort(rows[np.argpartition(-scores, k - 1)[:k]])
+            scores = self.dense(rows) @ query_vector
+
+        k = min(top_k, scores.size)
+        best = np.argpartition(-scores, k - 1)[:k]
+        return [(self.chunk_id(rows[i]), float(scores[i])) for i in best]
+
+
+def write_segment(
+    path: str,
+    row_versions: list[str],
+    chunk_ids: list[UUID] | np.ndarray,
+    vectors: np.ndarray,
+    quantization: str = "none"
+) -> None:
+    """
+    Writes one segment. row_versions gives the version id of every row;
+    chunk_ids are UUIDs or their (rows, 16) byte array.
+    """
+    if quantization not in ("none", "int8"):
+        raise ValueError(f"Unknown vector quantization: {quantization}")
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    count, dim = vectors.shape
+
+    if count >= settings.VECTOR_IVF_MIN_ROWS:
+        nlist = max(1, int(np.sqrt(count)))
+        centroids = _train_centroids(vectors, nlist)
+        assignments = np.argmax(vectors @ centroids.T, axis=1)
+    else:
+        nlist = 1
+        centroids = np.zeros((1, dim), dtype=np.float32)
+        assignments = np.zeros(count, dtype=np.int64)
+
+    order = np.argsort(assignments, kind="stable")
+    list_offsets = np.searchsorted(assignments[order], np.arange(nlist + 1)).tolist()
+    ordered = vectors[order]
+    ids = chunk_ids if isinstance(chunk_ids, np.ndarray) else _id_array(chunk_ids)
+    ids = np.ascontiguousarray(ids[order])
+
+    versions = list(dict.fromkeys(str(v) for v in row_versions))
+    header = {
+        "versions": versions,
+        "dim": dim,
+        "quantization": quantization,
+        "count": count,
+        "list_offsets": list_offsets
+    }
+    offsets = [
+        "centroids_offset", "vectors_offset", "chunk_ids_offset", "row_versions_offset", "scales_offset", "codes_offset"
+    ]
+    # Offsets depend on the header size, which depends on the offsets: reserve room for both
+    header_len = len(json.dumps({**header, **{key: 0 for key in offsets}})) + 128
+    header["centroids_offset"] = _aligned(8 + header_len)
+    data_end = header["centroids_offset"] + centroids.nbytes
+
+    if quantization == "int8":
+        # Symmetric per-dimension scalar quantization; the float32 rows are kept for re-scoring
+        scales = np.abs(ordered).max(axis=0) / 127.0 if count else np.zeros(dim)
+        scales[scales == 0] = 1.0
+        scales = scales.astype(np.float32)
+        codes = np.clip(np.rint(ordered / scales), -127, 127).astype(np.int8)
+        header["scales_offset"] = _aligned(data_end)
+        header["codes_offset"] = _aligned(header["scales_offset"] + scales.nbytes)
+        data_end = header["codes_offset"] + codes.nbytes
+    header["vectors_offset"] = _aligned(data_end)
+    data_end = header["vectors_offset"] + ordered.nbytes
+
+    header["chunk_ids_offset"] = _aligned(data_end)
+    data_end = header["chunk_ids_offset"] + ids.nbytes
+
+    if len(versions) > 1:
+        positions = {version_id: i for i, version_id in enumerate(versions)}
+        version_rows = np.asarray([positions[str(row_versions[i])] for i in order], dtype="<u4")
+        header["row_versions_offset"] = _aligned(data_end)
+        data_end = header["row_versions_offset"] + version_rows.nbytes
+
+    encoded = json.dumps(header).encode("utf-8").ljust(header_len)
+
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(SEGMENT_MAGIC)
+        f.write(struct.pack("<I", header_len))
+        f.write(encoded)
+        f.seek(header["centroids_offset"])
+        f.write(centroids.astype("<f4").tobytes())
+        if quantization == "int8":
+            f.seek(header["scales_offset"])
+            f.write(scales.tobytes())
+            f.seek(header["codes_offset"])
+            f.write(codes.tobytes())
+        f.seek(header["vectors_offset"])
+        f.write(ordered.astype("<f4").tobytes())
+        f.seek(header["chunk_ids_offset"])
+        f.write(ids.tobytes())
+        if len(versions) > 1:
+            f.seek(header["row_versions_offset"])
+            f.write(version_rows.tobytes())
+    os.replace(tmp_path, path)
+
+
+class VectorIndex:
+    """
+    Per-project approximate nearest-neighbour index under
+    storage_data/indexes/{project_id}/vectors. Each ingest appends immutable,
+    memory-mapped IVF segment files; a small manifest maps versions to their
+    segments. Worker processes share segment pages through the OS page cache
+    instead of each loading the full matrix. Small segments are merged in
+    tiers (see compact), so the number of segments a search visits stays
+    logarithmic in the number of rows.
+    """
+    def __init__(self, project_id: UUID, storage: LocalDiskStorage | None = None):
+        storage = storage or LocalDiskStorage()
+        self.dir = os.path.join(storage.base_path, "indexes", str(project_id), "vectors")
+        self.manifest_path = os.path.join(self.dir, "manifest.json")
+
+    def _load_manifest(self) -> dict:
+        return load_manifest(self.manifest_path)
+
+    def _save_manifest(self, manifest: dict) -> None:
+        save_manifest(self.manifest_path, manifest)
+
+    def _locked(self):
+        # Every manifest update is load -> modify -> save under this lock
+        return manifest_lock(self.manifest_path)
+
+    def _segment(self, name: str) -> VectorSegment:
+        return _segment_cache.get(os.path.join(self.dir, name), VectorSegment)
+
+    def _delete_segments(self, names) -> None:
+        for name in names:
+            path = os.path.join(self.dir, name)
+            _segment_cache.discard(path)
+            if os.path.exists(path):
+                os.remove(path)
+
+    def configure(self, quantization: str) -> None:
+        """
+        Sets the storage mode ("none" or "int8") used for this project's new segments.
+        Existing segments keep the mode they were written with.
+        """
+        if quantization not in ("none", "int8"):
+            raise ValueError(f"Unknown vector quantization: {quantization}")
+        with self._locked():
+            manifest = self._load_manifest()
+            manifest["quantization"] = quantization
+            self._save_manifest(manifest)
+
+    def add_version(self, version_id: UUID, chunk_ids: list[UUID], vectors: np.ndarray) -> None:
+        """
+        Indexes the chunks of one document version, replacing any previous segments for it.
+        """
+        self.remove_version(version_id)
+        self.append_segment(version_id, chunk_ids, vectors)
+
+    def append_segment(self, version_id: UUID, chunk_ids: list[UUID], vectors: np.ndarray) -> None:
+        """
+        Adds one more segment for a version without rewriting existing ones,
+        then merges small segments if a size tier is full.
+        """
+        name = self.write_pending(version_id, chunk_ids, vectors)
+        if name:
+            self.publish(version_id, [name])
+
+    def write_pending(self, version_id: UUID, chunk_ids: list[UUID], vectors: np.ndarray) -> str | None:
+        """
+        Writes a segment for a version without listing it in the manifest, so
+        searches don't see it until publish. Returns its name.
+        """
+        if not chunk_ids:
+            return None
+        os.makedirs(self.dir, exist_ok=True)
+        # Never reused, so no process can serve a stale mapping under this name
+        name = f"{version_id}-{uuid.uuid4().hex[:12]}.vseg"
+        write_segment(
+            os.path.join(self.dir, name),
+            [str(version_id)] * len(chunk_ids),
+            chunk_ids,
+            vectors,
+            quantization=self._load_manifest().get("quantization", settings.VECTOR_QUANTIZATION)
+        )
+        return name
+
+    def publish(self, version_id: UUID, names: list[str]) -> None:
+        """
+        Lists segments written by write_pending under their version, then
+        merges small segments if a size tier is full.
+        """
+        if not names:
+            return
+        with self._locked():
+            manifest = self._load_manifest()
+            manifest["versions"].setdefault(str(version_id), []).extend(names)
+            self._save_manifest(manifest)
+        self.compact()
+
+    def discard(self, names: list[str]) -> None:
+        """
+        Deletes segments written by write_pending that will not be published.
+        """
+        self._delete_segments(names)
+
+    def compact(self) -> None:
+        """
+        Tiered merging: segments whose row counts are within a factor of
+        VECTOR_MERGE_FACTOR share a tier, and once a tier holds that many
+        segments they are rewritten as one, keeping only rows of versions
+        still in the manifest. Per-batch segments thus grow into IVF-sized
+        ones, each row is rewritten O(log n) times, and segments of
+        VECTOR_MERGE_MAX_ROWS or more are left alone.
+
+        Merges are written without holding the manifest lock and swapped in
+        under it only if all their inputs are still listed; a merge that lost
+        a race with another merge or a removal is dropped and the scan rerun.
+        """
+        factor = settings.VECTOR_MERGE_FACTOR
+        while True:
+            manifest = self._load_manifest()
+            live = live_versions(manifest)
+            tiers: dict[int, list[str]] = {}
+            for name in live:
+                try:
+                    rows = self._segment(name).count
+                except FileNotFoundError:
+                    # Deleted since the manifest was read
+                    continue
+                if rows < settings.VECTOR_MERGE_MAX_ROWS:
+                    tiers.setdefault(int(math.log(max(rows, 1), factor)), []).append(name)
+            full = [names for _, names in sorted(tiers.items()) if len(names) >= factor]
+            if not full:
+                return
+            self._merge(manifest, live, full[0])
+
+    def _merge(self, manifest: dict, live: dict[str, set[str]], names: list[str]) -> None:
+        chunk_ids, row_versions, vectors = [], [], []
+        for name in names:
+            try:
+                segment = self._segment(name)
+            except FileNotFoundError:
+                return
+            mask = segment.live_mask(live[name])
+            rows = np.arange(segment.count) if mask is None else np.flatnonzero(mask)
+            versions = segment.version_of_rows()
+            chunk_ids.append(segment.chunk_ids[rows])
+            row_versions.extend(versions[row] for row in rows)
+            vectors.append(segment.dense(rows))
+
+        merged = f"merged-{uuid.uuid4().hex}.vseg"
+        write_segment(
+            os.path.join(self.dir, merged),
+            row_versions,
+            np.concatenate(chunk_ids),
+            np.vstack(vectors),
+            quantization=manifest.get("quantization", settings.VECTOR_QUANTIZATION)
+        )
+
+        with self._locked():
+            manifest = self._load_manifest()
+            # Versions removed meanwhile are not in the manifest, so their rows stay masked
+            if not swap_segments(manifest, set(names), merged):
+                self._delete_segments([merged])
+                return
+            self._save_manifest(manifest)
+        self._delete_segments(names)
+
+    def remove_version(self, version_id: UUID) -> None:
+        """
+        Drops a version from the index. Segments only it used are deleted;
+        its rows in merged segments are masked out until the next merge.
+        """
+        with self._locked():
+            manifest = self._load_manifest()
+            names = manifest["versions"].pop(str(version_id), None)
+            if not names:
+                return
+            self._save_manifest(manifest)
+        still_used = live_versions(manifest)
+        self._delete_segments([name for name in names if name not in still_used])
+
+    def get_vectors(self, version_id: UUID, chunk_ids: list[UUID]) -> dict[UUID, np.ndarray]:
+        """
+        Returns the stored full-precision vectors of the given chunks of a
+        version. Chunks that are not indexed are left out.
+        """
+        manifest = self._load_manifest()
+        found = {}
+        for name in manifest["versions"].get(str(version_id), []):
+            missing = [chunk_id for chunk_id in chunk_ids if chunk_id not in found]
+            if not missing:
+                break
+            segment = self._segment(name)
+            rows = segment.find_rows(str(version_id), missing)
+            if rows:
+                vectors = segment.dense(np.asarray(list(rows.values())))
+                found.update(zip(rows, np.array(vectors)))
+        return found
+
+    def search(
+        self,
+        query_vector: np.ndarray,
+        top_k: int,
+        version_ids: list[UUID] | None = None,
+        nprobe: int | None = None
+    ) -> list[tuple[UUID, float]]:
+        """
+        Returns up to top_k (chunk_id, cosine score) pairs, best first.
+        Restricts candidates to the given versions when provided.
+        """
+        manifest = self._load_manifest()
+        wanted = None if version_ids is None else {str(v) for v in version_ids}
+
+        query_vector = query_vector.astype(np.float32)
+        nprobe = nprobe or settings.VECTOR_NPROBE
+        results = []
+        for name, versions in live_versions(manifest).items():
+            allowed = versions if wanted is None else versions & wanted
+            if not allowed:
+                continue
+            results.extend(
+                self._segment(name).search(
+                    query_vector, top_k, nprobe, settings.VECTOR_RESCORE_FACTOR, allowed_versions=allowed
+                )
+            )
+
+        results.sort(key=lambda item: item[1], reverse=True)
+        return results[:top_k]
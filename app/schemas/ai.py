@@ -18,6 +18,7 @@ class AIRunResponse(BaseModel):
     status:str
     input_payload:Optional[Dict[str, Any]]=None
     output_payload:Optional[Dict[str, Any]]=None
+    retrieval_stats:Optional[Dict[str, Any]]=None
     error_message:Optional[str]=None
     created_at:datetime
     started_at:Optional[datetime]=None
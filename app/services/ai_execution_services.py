@@ -1,3 +1,4 @@
+import hashlib
 from uuid import UUID
 from sqlalchemy.orm import Session
 from app.repositories.document_repository import DocumentRepository
@@ -7,6 +8,8 @@ from app.repositories.ai_run_repository import AIRunRepository
 from app.repositories.job_repository import JobRepository
 from app.models.ai_run import AIRun
 from app.models.job import Job
+from app.core.config import settings
+from app.retrieval.pipeline import RetrievalPipeline
 
 class AIExecutionService:
     def __init__(self, db: Session):
@@ -17,6 +20,25 @@ class AIExecutionService:
         self.version_repo = DocumentVersionRepository(db)
         self.chunk_repo = DocumentChunkRepository(db)
 
+    def _chunk_ref(
+        self,
+        chunk_id: UUID,
+        index: int,
+        content_hash: str | None,
+        token_count: int | None,
+        overlap_chars: int | None,
+        text: str | None,
+        score: float | None
+    ) -> dict:
+        return {
+            "chunk_id":str(chunk_id),
+            "index":index,
+            "content_hash":content_hash or hashlib.sha256(text.encode("utf-8")).hexdigest(),
+            "tokens":token_count,
+            "overlap_chars":overlap_chars or 0,
+            "score":score
+        }
+
     def create_ai_run(
         self,
         project_id: UUID,
@@ -28,40 +50,62 @@ class AIExecutionService:
         Creates a new AI run for a given project, document IDs, and parameters.
         """
         try:
-            documents_payload=[]
+            parameters=parameters or {}
+            question=parameters.get("question", "")
+            top_k=int(parameters.get("top_k", settings.RETRIEVAL_TOP_K))
 
+            #Validate ownership and pick latest versions for all documents in one query
+            rows=self.version_repo.get_latest_for_documents(project_id, document_ids)
+            found={document.id: (document, version) for document, version in rows}
             for doc_id in document_ids:
-                #check doc belong to project
-                document=self.doc_repo.get_by_id(doc_id)
-                if not document or document.project_id != project_id:
+                if doc_id not in found:
                     raise ValueError(f"Document {doc_id} not found or does not belong to project {project_id}")
-                
-                #get latest version
-                version=self.version_repo.get_latest(doc_id)
-                if not version:
-                    continue
+            selected=[found[doc_id] for doc_id in dict.fromkeys(document_ids) if found[doc_id][1] is not None]
 
-                #fetch chunks
-                chunks=self.chunk_repo.list_by_version(version.id)
+            #Retrieve only the top-k chunks for the question (hybrid BM25 + vector)
+            refs_by_version={}
+            retrieval_stats=None
+            if question and selected:
+                result=RetrievalPipeline(project_id, self.chunk_repo).run(
+                    question,
+                    [version.id for _, version in selected],
+                    top_k=top_k,
+                    candidate_k=parameters.get("candidate_k"),
+                    rerank=parameters.get("rerank"),
+                    rerank_depth=parameters.get("rerank_depth")
+                )
+                retrieval_stats=result.stats
+                for chunk_id, score in result.hits:
+                    c=result.chunks[chunk_id]
+                    refs_by_version.setdefault(c.document_version_id, []).append(
+                        self._chunk_ref(c.id, c.chunk_index, c.content_hash, c.token_count, c.overlap_chars, c.text, score)
+                    )
+
+            if not refs_by_version:
+                #No question or nothing indexed yet: fall back to the full documents
+                for c in self.chunk_repo.stream_refs_by_versions([version.id for _, version in selected]):
+                    refs_by_version.setdefault(c.document_version_id, []).append(
+                        self._chunk_ref(c.id, c.chunk_index, c.content_hash, c.token_count, c.overlap_chars, c.legacy_text, None)
+                    )
+
+            documents_payload=[]
+            for document, version in selected:
+                refs=refs_by_version.get(version.id)
+                if not refs:
+                    continue
 
-                #Serialize from JSON storage
+                #Snapshot chunk references only; the worker resolves text lazily
                 documents_payload.append({
-                    "document_id": str(doc_id),
+                    "document_id": str(document.id),
                     "document_title": document.title,
                     "version_id": str(version.id),
-                    "chunks": [
-                        {
-                            "chunk_id":str(c.id),
-                            "text":c.text,
-                            "index":c.chunk_index
-                        }
-                        for c in chunks
-                    ]
+                    "chunks": sorted(refs, key=lambda ref: ref["index"])
                 })
 
             #Construct input payload
             input_payload={
                 "run_type":run_type,
+                "version_ids":[str(version.id) for _, version in selected],
                 "context_documents":documents_payload,
                 "user_parameters":parameters
             }
@@ -71,6 +115,7 @@ class AIExecutionService:
                 project_id=project_id,
                 run_type=run_type,
                 input_payload=input_payload,
+                retrieval_stats=retrieval_stats,
                 status="CREATED"
             )
             ai_run=self.ai_run_repo.create(ai_run)
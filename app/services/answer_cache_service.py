@@ -0,0 +1,98 @@
+import hashlib
+from uuid import UUID
+import numpy as np
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.models.answer_cache_entry import AnswerCacheEntry
+from app.repositories.answer_cache_repository import AnswerCacheRepository
+from app.retrieval.embedder import get_embedder
+from app.retrieval.tokenizer import tokenize
+
+def _normalize_question(question: str) -> str:
+    return " ".join(tokenize(question))
+
+class AnswerCacheService:
+    """
+    Semantic answer cache: reuses a stored AI answer when a new question over
+    the same set of document versions is close enough in embedding space.
+    With an embedder that is not semantic (the offline hashing backend),
+    only questions with the same normalized text match.
+    """
+    def __init__(self, db: Session):
+        self.db = db
+        self.cache_repo = AnswerCacheRepository(db)
+        self.embedder = get_embedder()
+
+    def embed(self, question: str) -> np.ndarray:
+        return self.embedder.embed_question(question)
+
+    def _version_key(self, run_type: str, version_ids: list[str]) -> str:
+        key = run_type + ":" + ",".join(sorted(str(v) for v in version_ids))
+        return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+    def lookup(
+        self,
+        project_id: UUID,
+        run_type: str,
+        version_ids: list[str],
+        question: str,
+        question_vector: np.ndarray
+    ) -> tuple[AnswerCacheEntry, float] | None:
+        """
+        Returns the most similar cached entry and its cosine similarity if it
+        clears SEMANTIC_CACHE_THRESHOLD, otherwise None. Without a semantic
+        embedder an entry matches only on equal normalized text (similarity 1.0).
+        """
+        entries = self.cache_repo.list_by_key(project_id, self._version_key(run_type, version_ids))
+        if not entries:
+            return None
+
+        if not self.embedder.semantic:
+            normalized = _normalize_question(question)
+            for entry in entries:
+                if _normalize_question(entry.question) == normalized:
+                    self.cache_repo.touch(entry)
+                    return entry, 1.0
+            return None
+
+        matrix = np.vstack([np.frombuffer(e.question_embedding, dtype=np.float32) for e in entries])
+        if matrix.shape[1] != question_vector.shape[0]:
+            return None
+        similarities = matrix @ question_vector.astype(np.float32)
+        best = int(np.argmax(similarities))
+        if similarities[best] < settings.SEMANTIC_CACHE_THRESHOLD:
+            return None
+
+        self.cache_repo.touch(entries[best])
+        return entries[best], float(similarities[best])
+
+    def store(
+        self,
+        project_id: UUID,
+        run_type: str,
+        version_ids: list[str],
+        document_ids: list[str],
+        question: str,
+        question_vector: np.ndarray,
+        output_payload: dict,
+        source_run_id: UUID | None = None
+    ) -> AnswerCacheEntry:
+        #Make room first so the new entry never competes with itself for eviction
+        self.cache_repo.evict_least_recently_used(project_id, settings.SEMANTIC_CACHE_MAX_ENTRIES - 1)
+        return self.cache_repo.create(
+            AnswerCacheEntry(
+                project_id=project_id,
+                version_key=self._version_key(run_type, version_ids),
+                document_ids=[str(d) for d in document_ids],
+                question=question,
+                question_embedding=question_vector.astype(np.float32).tobytes(),
+                output_payload=output_payload,
+                source_run_id=source_run_id
+            )
+        )
+
+    def invalidate_document(self, project_id: UUID, document_id: UUID) -> int:
+        """
+        Drops cached answers built from any version of the document.
+        """
+        return self.cache_repo.delete_for_document(project_id, document_id)
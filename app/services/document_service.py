@@ -1,12 +1,14 @@
 import hashlib
+import uuid
 from uuid import UUID
 from sqlalchemy.orm import Session
 from app.models.document import Document
 from app.models.document_version import DocumentVersion
-from app.models.document_chunk import DocumentChunk
+from app.models.job import Job
 from app.repositories.document_repository import DocumentRepository
 from app.repositories.document_version_repository import DocumentVersionRepository
 from app.repositories.document_chunk_repository import DocumentChunkRepository
+from app.repositories.job_repository import JobRepository
 
 class DocumentService:
     def __init__(self, db: Session):
@@ -14,7 +16,7 @@ class DocumentService:
         # Initialize all three repositories
         self.doc_repo = DocumentRepository(db)
         self.version_repo = DocumentVersionRepository(db)
-        # self.chunk_repo = DocumentChunkRepository(db)
+        self.chunk_repo = DocumentChunkRepository(db)
 
     def create_document_metadata(
         self,
@@ -56,6 +58,40 @@ class DocumentService:
             self.db.rollback()
             raise e
 
+    def create_documents_batch(
+        self,
+        project_id: UUID,
+        created_by: UUID,
+        files: list[tuple[str, str, str]]
+    ) -> list[tuple[Document, DocumentVersion]]:
+        """
+        Creates a document and its first version for each (title, file_path, content_hash).
+        Ids are assigned up front so all rows go out in one flush; the caller commits.
+        """
+        created = []
+        for title, file_path, content_hash in files:
+            document = Document(
+                id=uuid.uuid4(),
+                project_id=project_id,
+                title=title,
+                created_by=created_by
+            )
+            version = DocumentVersion(
+                id=uuid.uuid4(),
+                document_id=document.id,
+                version_number=1,
+                file_path=file_path,
+                content_hash=content_hash,
+                created_by=created_by
+            )
+            created.append((document, version))
+
+        self.db.add_all([document for document, _ in created])
+        self.db.flush()
+        self.db.add_all([version for _, version in created])
+        self.db.flush()
+        return created
+
     def create_new_version(
         self,
         document_id: UUID,
@@ -65,8 +101,16 @@ class DocumentService:
     ) -> DocumentVersion:
         """
         Adds a NEW version to an existing document. Does NOT update old records.
+        The file must already be in storage at file_path. The version starts
+        PENDING and a DOCUMENT_INGEST job is queued in the same transaction;
+        the ingest reuses everything derived from chunks that are unchanged
+        since the previous version.
         """
         try:
+            document = self.doc_repo.get_by_id(document_id)
+            if not document:
+                raise ValueError(f"Document not found: {document_id}")
+
             # 1. Determine next version number
             latest_version = self.version_repo.get_latest(document_id)
             next_number = (latest_version.version_number + 1) if latest_version else 1
@@ -83,20 +127,16 @@ class DocumentService:
             )
             version = self.version_repo.create(new_version)
 
-            # 3. Create Chunks for THIS version
-            chunks = []
-            chunk_size = 500
-            for i, start in enumerate(range(0, len(content), chunk_size)):
-                text_segment = content[start : start + chunk_size]
-                chunks.append(
-                    DocumentChunk(
-                        document_version_id=version.id,
-                        chunk_index=i,
-                        text=text_segment
-                    )
+            # 3. Chunks, indexes and answer cache invalidation are left to the ingest worker
+            JobRepository(self.db).create(
+                Job(
+                    project_id=document.project_id,
+                    job_type="DOCUMENT_INGEST",
+                    target_type="DOCUMENT_VERSION",
+                    target_id=version.id,
+                    payload={"file_name": document.title, "file_path": file_path}
                 )
-
-            self.chunk_repo.bulk_create(chunks)
+            )
 
             # 4. Commit
             self.db.commit()
@@ -107,6 +147,15 @@ class DocumentService:
             self.db.rollback()
             raise e
 
+    def find_duplicate_version(self, project_id: UUID, content_hash: str) -> DocumentVersion | None:
+        """
+        Looks up an existing version of the project with the same file content.
+        """
+        return self.version_repo.find_by_content_hash(project_id, content_hash)
+
+    def find_duplicate_versions(self, project_id: UUID, content_hashes: list[str]) -> dict[str, DocumentVersion]:
+        return self.version_repo.find_by_content_hashes(project_id, content_hashes)
+
     def list_project_documents(self, project_id: UUID):
         """
         Simple pass-through to list documents.
@@ -1,4 +1,16 @@
 from abc import ABC, abstractmethod
+from typing import Iterable, Iterator
+
+class StagedFile:
+    """
+    An upload written to temporary storage, with its SHA256 and size,
+    waiting to be committed to its final path or discarded.
+    """
+    def __init__(self, temp_path: str, content_hash: str, size: int):
+        self.temp_path = temp_path
+        self.content_hash = content_hash
+        self.size = size
+
 
 class Storage(ABC):
     @abstractmethod
@@ -17,6 +29,47 @@ class Storage(ABC):
         """
         pass
 
+    @abstractmethod
+    def read_stream(self, path: str, block_size: int = 1024 * 1024) -> Iterator[bytes]:
+        """
+        Yield the bytes at a specific path in blocks of at most block_size,
+        so consumers never hold the whole object in memory.
+        Raises error if not found.
+        """
+        pass
+
+    @abstractmethod
+    def read_range(self, path: str, offset: int, length: int) -> bytes:
+        """
+        Retrieve at most length bytes starting at offset, without reading
+        the rest of the object. Raises error if not found.
+        """
+        pass
+
+    @abstractmethod
+    def stage(self, blocks: Iterable[bytes]) -> StagedFile:
+        """
+        Write a stream of byte blocks to temporary storage, hashing as it goes,
+        so the caller can decide on the final path once the hash is known.
+        """
+        pass
+
+    @abstractmethod
+    def commit_staged(self, staged: StagedFile, path: str) -> str:
+        """
+        Atomically move a staged file into place and return the path it is
+        stored under. `path` is the requested location; content-addressed
+        backends derive the location from the hash instead.
+        """
+        pass
+
+    @abstractmethod
+    def discard_staged(self, staged: StagedFile) -> None:
+        """
+        Drop a staged file that will not be kept.
+        """
+        pass
+
     @abstractmethod
     def delete(self, path: str) -> None:
         """
@@ -0,0 +1,162 @@
+import json
+import mmap
+import os
+import shutil
+import struct
+import threading
+import zlib
+from collections import OrderedDict
+from uuid import UUID
+
+from app.core.config import settings
+from app.retrieval.segment_cache import SegmentCache
+from app.storage.local import LocalDiskStorage
+
+SEGMENT_MAGIC = b"CSEG"
+# Uncompressed bytes per compression block; reading one chunk inflates one block
+BLOCK_SIZE = 64 * 1024
+COMPRESSION_LEVEL = 6
+# Inflated blocks kept per open segment
+INFLATED_BLOCKS = 8
+
+# Segment files are immutable once written, so mapped pages can be shared per process
+_segment_cache = SegmentCache(settings.INDEX_SEGMENT_CACHE_SIZE)
+
+
+class ChunkSegment:
+    """
+    Read-only, memory-mapped view over one chunk text segment:
+
+        CSEG | uint32 header length | header JSON | zlib blocks
+
+    The header lists each block as (byte offset, compressed length) and each
+    chunk as (block, start, length) within the inflated block. Chunks never
+    span blocks. Recently inflated blocks are kept so neighbouring chunks
+    cost one decompression; segments are shared across threads, so that LRU
+    is guarded by a lock.
+    """
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mm[:4] != SEGMENT_MAGIC:
+            raise ValueError(f"Not a chunk segment: {path}")
+        (header_len,) = struct.unpack_from("<I", self._mm, 4)
+        header = json.loads(self._mm[8:8 + header_len])
+        self.blocks = header["blocks"]
+        self.chunks = header["chunks"]
+        self._base = 8 + header_len
+        self._inflated: OrderedDict[int, bytes] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _block(self, block: int) -> bytes:
+        with self._lock:
+            data = self._inflated.get(block)
+            if data is not None:
+                self._inflated.move_to_end(block)
+                return data
+
+        # Inflated outside the lock; if two threads race, both get the same bytes
+        offset, length = self.blocks[block]
+        start = self._base + offset
+        data = zlib.decompress(self._mm[start:start + length])
+        with self._lock:
+            self._inflated[block] = data
+            self._inflated.move_to_end(block)
+            while len(self._inflated) > INFLATED_BLOCKS:
+                self._inflated.popitem(last=False)
+        return data
+
+    def text(self, slot: int) -> str:
+        block, start, length = self.chunks[slot]
+        return self._block(block)[start:start + length].decode("utf-8")
+
+
+class ChunkStore:
+    """
+    Optional home for chunk text outside the database, under
+    storage_data/chunk_store/{version_id}. Each ingest batch becomes one
+    compressed segment; chunk rows keep only (segment, slot) and readers
+    fetch the text through mmap, so repeated reads are page-cache hits.
+    Unchanged chunks of a new version point into the segment of the version
+    they were first written for, named "{version_id}/{name}".
+    """
+    def __init__(self, storage: LocalDiskStorage | None = None):
+        storage = storage or LocalDiskStorage()
+        self.dir = os.path.join(storage.base_path, "chunk_store")
+
+    def _version_dir(self, version_id: UUID) -> str:
+        return os.path.join(self.dir, str(version_id))
+
+    def write_segment(self, version_id: UUID, number: int, texts: list[str]) -> str:
+        """
+        Writes one segment for a batch of chunk texts and returns its name.
+        Slot i of the segment holds texts[i].
+        """
+        blocks, chunks = [], []
+        body = bytearray()
+        pending = bytearray()
+
+        def flush():
+            compressed = zlib.compress(bytes(pending), COMPRESSION_LEVEL)
+            blocks.append([len(body), len(compressed)])
+            body.extend(compressed)
+            pending.clear()
+
+        for text in texts:
+            encoded = text.encode("utf-8")
+            if pending and len(pending) + len(encoded) > BLOCK_SIZE:
+                flush()
+            chunks.append([len(blocks), len(pending), len(encoded)])
+            pending.extend(encoded)
+        if pending:
+            flush()
+
+        header = json.dumps({"version_id": str(version_id), "blocks": blocks, "chunks": chunks}).encode("utf-8")
+        name = f"{number}.cseg"
+        path = os.path.join(self._version_dir(version_id), name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(SEGMENT_MAGIC)
+            f.write(struct.pack("<I", len(header)))
+            f.write(header)
+            f.write(body)
+        os.replace(tmp_path, path)
+        return name
+
+    def qualified_name(self, version_id: UUID, name: str) -> str:
+        """
+        Name under which another version's chunk rows can refer to a segment.
+        """
+        return name if "/" in name else f"{version_id}/{name}"
+
+    def _segment(self, version_id: UUID, name: str) -> ChunkSegment:
+        if "/" in name:
+            return _segment_cache.get(os.path.join(self.dir, name), ChunkSegment)
+        return _segment_cache.get(os.path.join(self._version_dir(version_id), name), ChunkSegment)
+
+    def read(self, version_id: UUID, name: str, slot: int) -> str:
+        return self._segment(version_id, name).text(slot)
+
+    def remove_version(self, version_id: UUID) -> None:
+        """
+        Drops all segments of a version, e.g. before re-running a failed ingest.
+        """
+        version_dir = self._version_dir(version_id)
+        if os.path.isdir(version_dir):
+            for name in os.listdir(version_dir):
+                _segment_cache.discard(os.path.join(version_dir, name))
+        shutil.rmtree(version_dir, ignore_errors=True)
+
+
+_chunk_store: ChunkStore | None = None
+
+def get_chunk_store() -> ChunkStore:
+    """
+    Returns the process-wide chunk store, created on first use rather than at import.
+    """
+    global _chunk_store
+    if _chunk_store is None:
+        _chunk_store = ChunkStore()
+    return _chunk_store
@@ -0,0 +1,41 @@
+import hashlib
+import os
+from app.storage.base import StagedFile
+from app.storage.local import LocalDiskStorage
+
+BLOB_DIR = "blobs"
+
+
+class ContentAddressedStorage(LocalDiskStorage):
+    """
+    Stores uploaded blobs by SHA256 under blobs/ab/cd/<hash>, so identical
+    content is kept once, names never collide and no directory grows past
+    65536 shards. Every write goes through a temp file and a rename.
+    Plain paths (indexes, caches, files stored before this backend) are
+    still read and written as in LocalDiskStorage.
+    """
+    def blob_path(self, content_hash: str) -> str:
+        return os.path.join(BLOB_DIR, content_hash[:2], content_hash[2:4], content_hash)
+
+    def put(self, content: bytes) -> str:
+        """
+        Stores bytes under their hash and returns the blob path.
+        """
+        path = self.blob_path(hashlib.sha256(content).hexdigest())
+        if not os.path.exists(self._full_path(path)):
+            self.save(path, content)
+        return path
+
+    def commit_staged(self, staged: StagedFile, path: str) -> str:
+        blob_path = self.blob_path(staged.content_hash)
+        if os.path.exists(self._full_path(blob_path)):
+            # Same bytes are already stored
+            self.discard_staged(staged)
+            return blob_path
+        return super().commit_staged(staged, blob_path)
+
+    def delete(self, path: str) -> None:
+        # Blobs can be shared by several versions, so they are never removed by path
+        if path.startswith(BLOB_DIR + os.sep):
+            return
+        super().delete(path)
@@ -0,0 +1,15 @@
+from app.core.config import settings
+from app.storage.base import Storage
+from app.storage.content_addressed import ContentAddressedStorage
+from app.storage.local import LocalDiskStorage
+
+
+def get_storage() -> Storage:
+    """
+    Returns the storage backend selected by STORAGE_BACKEND.
+    """
+    if settings.STORAGE_BACKEND == "content_addressed":
+        return ContentAddressedStorage()
+    if settings.STORAGE_BACKEND == "local":
+        return LocalDiskStorage()
+    raise ValueError(f"Unknown storage backend: {settings.STORAGE_BACKEND}")
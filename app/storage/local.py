@@ -1,5 +1,11 @@
+import hashlib
 import os
-from app.storage.base import Storage
+import tempfile
+from typing import Iterable, Iterator
+from app.storage.base import StagedFile, Storage
+
+# Staged uploads live under the base path so committing them is a same-filesystem rename
+STAGING_DIR = ".staging"
 
 class LocalDiskStorage(Storage):
     def __init__(self, base_path: str = "storage_data"):
@@ -17,8 +23,16 @@ class LocalDiskStorage(Storage):
         # Ensure the sub-directories exist (e.g. creating the project_id folder)
         os.makedirs(os.path.dirname(full_path), exist_ok=True)
         
-        with open(full_path, "wb") as f:
-            f.write(content)
+        # Write next to the target and rename, so readers never see a partial file
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(full_path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(content)
+            os.replace(temp_path, full_path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
 
     def read(self, path: str) -> bytes:
         full_path = self._full_path(path)
@@ -28,6 +42,57 @@ class LocalDiskStorage(Storage):
         with open(full_path, "rb") as f:
             return f.read()
 
+    def read_stream(self, path: str, block_size: int = 1024 * 1024) -> Iterator[bytes]:
+        full_path = self._full_path(path)
+        # Checked eagerly so a missing file fails here, not on first iteration
+        if not os.path.exists(full_path):
+            raise FileNotFoundError(f"File not found at {path}")
+        return self._iter_blocks(full_path, block_size)
+
+    def _iter_blocks(self, full_path: str, block_size: int) -> Iterator[bytes]:
+        with open(full_path, "rb") as f:
+            while True:
+                block = f.read(block_size)
+                if not block:
+                    break
+                yield block
+
+    def read_range(self, path: str, offset: int, length: int) -> bytes:
+        full_path = self._full_path(path)
+        if not os.path.exists(full_path):
+            raise FileNotFoundError(f"File not found at {path}")
+
+        with open(full_path, "rb") as f:
+            f.seek(offset)
+            return f.read(length)
+
+    def stage(self, blocks: Iterable[bytes]) -> StagedFile:
+        staging_dir = self._full_path(STAGING_DIR)
+        os.makedirs(staging_dir, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=staging_dir, suffix=".upload")
+        digest = hashlib.sha256()
+        size = 0
+        try:
+            with os.fdopen(fd, "wb") as f:
+                for block in blocks:
+                    digest.update(block)
+                    f.write(block)
+                    size += len(block)
+        except BaseException:
+            os.remove(temp_path)
+            raise
+        return StagedFile(temp_path, digest.hexdigest(), size)
+
+    def commit_staged(self, staged: StagedFile, path: str) -> str:
+        full_path = self._full_path(path)
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        os.replace(staged.temp_path, full_path)
+        return path
+
+    def discard_staged(self, staged: StagedFile) -> None:
+        if os.path.exists(staged.temp_path):
+            os.remove(staged.temp_path)
+
     def delete(self, path: str) -> None:
         full_path = self._full_path(path)
         if os.path.exists(full_path):
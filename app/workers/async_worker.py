@@ -0,0 +1,191 @@
+import asyncio
+import os
+import signal
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from uuid import UUID
+
+sys.path.append(os.getcwd())
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.core.job_notifier import get_job_notifier
+from app.repositories.job_repository import JobRepository
+from app.workers.dispatcher import dispatch_job
+
+
+def run_claimed_job(job_id: UUID) -> str | None:
+    """
+    Runs one already-claimed job on its own session and returns its error, or
+    None on success. Called from executor threads, so nothing here is shared
+    between jobs. The outcome is recorded later, batched with other jobs.
+    """
+    db = SessionLocal()
+    try:
+        job = JobRepository(db).get_by_id(job_id)
+        print(f"Processing job {job_id} for target {job.job_type}")
+        try:
+            dispatch_job(job, db)
+            print(f"Job {job_id} completed successfully")
+            return None
+        except Exception as e:
+            print(f"Job {job_id} failed: {e}")
+            db.rollback()
+            return str(e)
+    finally:
+        db.close()
+
+
+class AsyncWorker:
+    """
+    Runs many jobs at once in one process. Each job type gets its own
+    concurrency limit (WORKER_CONCURRENCY) and its own thread pool of that
+    size: handlers are synchronous, so I/O-bound AI runs simply wait in their
+    threads while CPU-heavy ingest is capped to a few slots and fans out to
+    the ingest process pool. The event loop only claims jobs for types with
+    free slots, so it never takes work it cannot start. Finished jobs are
+    recorded in batches, in the same round trip as the next claim.
+    """
+    def __init__(self, concurrency: dict[str, int] | None = None, poll_interval: float | None = None):
+        self.concurrency = concurrency or settings.WORKER_CONCURRENCY
+        self.poll_interval = poll_interval or settings.WORKER_POLL_INTERVAL
+        self.running: dict[str, int] = {job_type: 0 for job_type in self.concurrency}
+        self.executors = {
+            job_type: ThreadPoolExecutor(max_workers=limit, thread_name_prefix=job_type.lower())
+            for job_type, limit in self.concurrency.items()
+        }
+        self.tasks: set[asyncio.Task] = set()
+        self.succeeded: list[UUID] = []
+        self.failed: dict[UUID, str] = {}
+        self.stopping = asyncio.Event()
+        self._wakeup = asyncio.Event()
+
+    def free_slots(self) -> dict[str, int]:
+        return {
+            job_type: limit - self.running[job_type]
+            for job_type, limit in self.concurrency.items()
+            if limit > self.running[job_type]
+        }
+
+    def take_results(self) -> tuple[list[UUID], dict[UUID, str]]:
+        succeeded, failed = self.succeeded, self.failed
+        self.succeeded, self.failed = [], {}
+        return succeeded, failed
+
+    def record(self, succeeded: list[UUID], failed: dict[UUID, str]) -> None:
+        db = SessionLocal()
+        try:
+            JobRepository(db).record_results(succeeded, failed)
+        finally:
+            db.close()
+
+    def claim(self, succeeded: list[UUID], failed: dict[UUID, str]) -> tuple[bool, list]:
+        """
+        Records finished jobs, then claims up to the free capacity of every
+        job type. Runs in a thread. Returns whether the outcomes were written
+        and the claimed (id, type) pairs; a failed claim only claims nothing,
+        so outcomes already written are never handed back for a retry.
+        """
+        db = SessionLocal()
+        try:
+            job_repo = JobRepository(db)
+            recorded = True
+            if succeeded or failed:
+                try:
+                    job_repo.record_results(succeeded, failed)
+                except Exception as e:
+                    print(f"Error recording job results: {e}")
+                    db.rollback()
+                    recorded = False
+            claimed = []
+            try:
+                for job_type, slots in self.free_slots().items():
+                    claimed.extend((job.id, job.job_type) for job in job_repo.claim_next(limit=slots, job_types=[job_type]))
+            except Exception as e:
+                print(f"Error claiming jobs: {e}")
+                db.rollback()
+            return recorded, claimed
+        finally:
+            db.close()
+
+    async def run_job(self, job_id: UUID, job_type: str) -> None:
+        loop = asyncio.get_running_loop()
+        try:
+            error = await loop.run_in_executor(self.executors[job_type], run_claimed_job, job_id)
+            if error is None:
+                self.succeeded.append(job_id)
+            else:
+                self.failed[job_id] = error
+        finally:
+            self.running[job_type] -= 1
+            self._wakeup.set()
+
+    def _listen(self, loop: asyncio.AbstractEventLoop) -> None:
+        """
+        Notification thread: turns job-created notifications into loop wakeups.
+        """
+        while not self.stopping.is_set():
+            if get_job_notifier().wait(1.0):
+                loop.call_soon_threadsafe(self._wakeup.set)
+
+    async def run(self) -> None:
+        print(f"Async worker started with limits {self.concurrency}")
+        loop = asyncio.get_running_loop()
+        get_job_notifier().listen()
+        threading.Thread(target=self._listen, args=(loop,), daemon=True).start()
+        while not self.stopping.is_set():
+            # Cleared before claiming, so a job finishing or arriving meanwhile still wakes the loop
+            self._wakeup.clear()
+            claimed = []
+            if self.free_slots():
+                succeeded, failed = self.take_results()
+                try:
+                    recorded, claimed = await asyncio.to_thread(self.claim, succeeded, failed)
+                except Exception as e:
+                    print(f"Error claiming jobs: {e}")
+                    recorded = False
+                if not recorded:
+                    # Back into the buffer, retried with the next round
+                    self.succeeded.extend(succeeded)
+                    self.failed.update(failed)
+
+            for job_id, job_type in claimed:
+                self.running[job_type] += 1
+                task = asyncio.create_task(self.run_job(job_id, job_type))
+                self.tasks.add(task)
+                task.add_done_callback(self.tasks.discard)
+
+            if claimed and self.free_slots():
+                # More work may be waiting; claim again right away
+                continue
+
+            # Idle or saturated: wait for a new job, a finished job, shutdown or the fallback poll
+            waiters = [asyncio.create_task(self._wakeup.wait()), asyncio.create_task(self.stopping.wait())]
+            await asyncio.wait(waiters, timeout=self.poll_interval, return_when=asyncio.FIRST_COMPLETED)
+            for waiter in waiters:
+                waiter.cancel()
+
+        print(f"Worker shutting down, waiting for {len(self.tasks)} running jobs")
+        if self.tasks:
+            await asyncio.gather(*self.tasks, return_exceptions=True)
+        succeeded, failed = self.take_results()
+        if succeeded or failed:
+            await asyncio.to_thread(self.record, succeeded, failed)
+        for executor in self.executors.values():
+            executor.shutdown(wait=True)
+
+    def stop(self) -> None:
+        self.stopping.set()
+
+
+async def main() -> None:
+    worker = AsyncWorker()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, worker.stop)
+    await worker.run()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -3,9 +3,43 @@ from sqlalchemy.orm import Session
 from app.models.job import Job
 from app.repositories.ai_run_repository import AIRunRepository
 from uuid import UUID
+from app.core.config import settings
+from app.retrieval.context_packer import pack_context
+from app.retrieval.chunk_cache import chunk_cache
+from app.repositories.document_chunk_repository import DocumentChunkRepository
+from app.services.answer_cache_service import AnswerCacheService
+from app.workers.llm_cache import cached_chat_completion
 from openai import OpenAI
 client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
 
+def resolve_chunk_text(documents: list[dict], db: Session) -> list[dict]:
+    """
+    Resolves the chunk references snapshotted on the run into text through the
+    shared chunk cache, verifying each chunk against its recorded content hash.
+    """
+    chunk_ids = [
+        UUID(chunk["chunk_id"])
+        for doc in documents
+        for chunk in doc.get("chunks", [])
+        if "text" not in chunk
+    ]
+    cached = chunk_cache.get_many(DocumentChunkRepository(db), chunk_ids)
+
+    resolved = []
+    for doc in documents:
+        chunks = []
+        for chunk in doc.get("chunks", []):
+            if "text" in chunk:
+                #Older runs snapshotted the text inline
+                chunks.append(chunk)
+                continue
+            entry = cached.get(UUID(chunk["chunk_id"]))
+            if entry is None or entry.content_hash != chunk.get("content_hash"):
+                raise ValueError(f"Chunk {chunk['chunk_id']} is missing or changed since the run was created")
+            chunks.append({**chunk, "text": entry.text, "tokens": chunk.get("tokens") or entry.token_count})
+        resolved.append({**doc, "chunks": chunks})
+    return resolved
+
 def handle_ai_run(job: Job, db: Session):
     print(f"[WORKER] Starting AI Execution for Job {job.id}")
     
@@ -26,15 +60,38 @@ def handle_ai_run(job: Job, db: Session):
 
     try:
         input_data = ai_run.input_payload
-        documents = input_data.get("context_documents", [])
         user_params = input_data.get("user_parameters", {})
         question = user_params.get("question", "")
 
-        context_text = ""
-        for doc in documents:
-            doc_title = doc.get("document_title", "Untitled")
-            for chunk in doc.get("chunks", []):
-                context_text += f"\n--- Document: {doc_title} ---\n{chunk['text']}\n"
+        #Semantic answer cache: same versions + near-identical question -> reuse the answer
+        cache_service = None
+        if question and settings.SEMANTIC_CACHE_ENABLED and user_params.get("use_cache", True):
+            cache_service = AnswerCacheService(db)
+            version_ids = input_data.get("version_ids") or [
+                d["version_id"] for d in input_data.get("context_documents", [])
+            ]
+            question_vector = cache_service.embed(question)
+            cached = cache_service.lookup(ai_run.project_id, ai_run.run_type, version_ids, question, question_vector)
+            if cached:
+                entry, similarity = cached
+                ai_run.output_payload = {
+                    **entry.output_payload,
+                    "cache": {
+                        "semantic": "hit",
+                        "match": "semantic" if cache_service.embedder.semantic else "exact",
+                        "similarity": round(similarity, 4),
+                        "source_run_id": str(entry.source_run_id) if entry.source_run_id else None
+                    }
+                }
+                ai_run_repo.mark_success(ai_run)
+                print(f"[WORKER] AI Run {ai_run.id} served from semantic cache.")
+                return
+
+        documents = resolve_chunk_text(input_data.get("context_documents", []), db)
+
+        token_budget = int(user_params.get("max_context_tokens", settings.CONTEXT_TOKEN_BUDGET))
+        packed = pack_context(documents, token_budget)
+        context_text = packed.text
 
         if not context_text:
             context_text = "No relevant documents found."
@@ -54,7 +111,8 @@ def handle_ai_run(job: Job, db: Session):
             """
 
         print(f"[WORKER] Sending request to OpenAI for Run {ai_run.id}...")
-        response = client.chat.completions.create(
+        result, response_cache_hit = cached_chat_completion(
+            client,
             model="gpt-4o-mini", # or gpt-3.5-turbo
             messages=[
                 {"role": "system", "content": system_prompt},
@@ -63,14 +121,26 @@ def handle_ai_run(job: Job, db: Session):
             temperature=0.0 # Deterministic
         )
 
-        answer = response.choices[0].message.content
-
         ai_run.output_payload = {
-            "answer": answer,
-            "model": response.model,
-            "usage": {
-                "prompt_tokens": response.usage.prompt_tokens,
-                "completion_tokens": response.usage.completion_tokens
+            **result,
+            "context": packed.stats
+        }
+        if cache_service:
+            cache_service.store(
+                ai_run.project_id,
+                ai_run.run_type,
+                version_ids,
+                [d["document_id"] for d in input_data.get("context_documents", [])],
+                question,
+                question_vector,
+                ai_run.output_payload,
+                source_run_id=ai_run.id
+            )
+        ai_run.output_payload = {
+            **ai_run.output_payload,
+            "cache": {
+                "semantic": "miss" if cache_service else "skipped",
+                "response": "hit" if response_cache_hit else "miss"
             }
         }
         ai_run_repo.mark_success(ai_run)
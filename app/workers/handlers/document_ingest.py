@@ -1,46 +1,93 @@
+from uuid import UUID
 from sqlalchemy.orm import Session
 from app.models.job import Job
-from app.models.document_chunk import DocumentChunk
+from app.models.document_version import DocumentVersion
 from app.repositories.document_chunk_repository import DocumentChunkRepository
 from app.repositories.document_version_repository import DocumentVersionRepository
-from app.storage.local import LocalDiskStorage
+from app.storage.factory import get_storage
+from app.ingest.pipeline import IngestPipeline
+from app.services.answer_cache_service import AnswerCacheService
 
-CHUNK_SIZE=500
+def ingest_version(version:DocumentVersion, project_id:UUID, db:Session) -> str:
+    """
+    Chunks, embeds and indexes one document version and commits it as READY,
+    dropping cached answers built from the document's older versions. Index
+    segments are published only after the commit. If the ingest fails they
+    are deleted and the version is committed as FAILED, so upload dedup stops
+    matching it. Returns a one-line summary.
+    """
+    version_repo=DocumentVersionRepository(db)
+    chunk_repo=DocumentChunkRepository(db)
+    storage=get_storage()
+
+    #Idempotency check to ensure chunks are not re-hashed.
+    if chunk_repo.hash_chunks(version.id):
+        return "skipped, chunks are already hashed"
+
+    #Unchanged chunks of the previous version keep their vectors, BM25 entries, token counts and stored text
+    previous=version_repo.get_previous(version)
+
+    #Read -> chunk/hash -> embed -> write run as overlapping stages, see IngestPipeline
+    pipeline=IngestPipeline(db, storage, project_id)
+    try:
+        try:
+            result=pipeline.run(version, previous)
+        except (OSError, UnicodeDecodeError) as e:
+            raise ValueError(f"Failed to read file: {e}")
+        version_repo.mark_ingest_status(version, "READY")
+        #Cached answers built from the document's older versions no longer apply
+        if previous:
+            AnswerCacheService(db).invalidate_document(project_id, version.document_id)
+        db.commit()
+    except Exception:
+        db.rollback()
+        pipeline.discard()
+        version_repo.mark_ingest_status(version, "FAILED")
+        db.commit()
+        raise
+    pipeline.publish()
+
+    mb_per_second=result.bytes_read/result.elapsed/(1024*1024) if result.elapsed > 0 else 0.0
+    return (
+        f"{result.chunk_count} chunks ({result.reused_count} reused from previous version), "
+        f"{result.bytes_read} bytes in {result.elapsed:.2f}s ({mb_per_second:.2f} MB/s), stages {result.stages}"
+    )
 
 def handle_document_ingest(job:Job,db:Session):
     #place holder for data ingestion logic
     print(f"worker starting job {job.id} for target {job.target_id}")
 
-    #initialize dependencies
-    version_repo=DocumentVersionRepository(db)
-    chunk_repo=DocumentChunkRepository(db)
-    storage=LocalDiskStorage()
-
-    version=version_repo.get_by_id(job.target_id)
+    version=DocumentVersionRepository(db).get_by_id(job.target_id)
     if not version:
         raise ValueError(f"Document version not found: {job.target_id}")
-    
-    #Idempotency check to ensure chunks are not re-hashed.
-    if chunk_repo.hash_chunks(version.id):
-        print(f"worker skipped job {job.id} for target {job.target_id} because chunks are already hashed")
-        return
 
-    try:
-        content_bytes=storage.read(version.file_path)
-        content_text=content_bytes.decode("utf-8")
-    except Exception as e:
-        raise ValueError(f"Failed to read file: {e}")
-    
-    chunks=[]
-    for i,start in enumerate(range(0, len(content_text), CHUNK_SIZE)):
-        text_segment=content_text[start:start+CHUNK_SIZE]
-        chunks.append(
-            DocumentChunk(
-                document_version_id=version.id,
-                chunk_index=i,
-                text=text_segment
-            )
-        )
-    chunk_repo.bulk_create(chunks)
-
-    print(f"worker completed job {job.id} for target {job.target_id}")
\ No newline at end of file
+    summary=ingest_version(version, job.project_id, db)
+    print(f"worker completed job {job.id} for target {job.target_id}: {summary}")
+
+def handle_document_ingest_batch(job:Job,db:Session):
+    """
+    Ingests every version listed in the job payload. Each version is committed
+    on its own by ingest_version, so a retry skips the ones already done;
+    failures are collected and reported together after the rest of the batch
+    has run.
+    """
+    version_ids=job.payload.get("version_ids", [])
+    print(f"worker starting batch job {job.id} with {len(version_ids)} versions")
+
+    version_repo=DocumentVersionRepository(db)
+    failed=[]
+    for version_id in version_ids:
+        version=version_repo.get_by_id(UUID(version_id))
+        try:
+            if not version:
+                raise ValueError(f"Document version not found: {version_id}")
+            summary=ingest_version(version, job.project_id, db)
+            print(f"worker ingested version {version_id} of batch job {job.id}: {summary}")
+        except Exception as e:
+            db.rollback()
+            failed.append(version_id)
+            print(f"worker failed version {version_id} of batch job {job.id}: {e}")
+
+    if failed:
+        raise ValueError(f"{len(failed)} of {len(version_ids)} versions failed to ingest: {', '.join(failed)}")
+    print(f"worker completed batch job {job.id}")
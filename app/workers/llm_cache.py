@@ -0,0 +1,147 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from app.core.config import settings
+from app.storage.local import LocalDiskStorage
+
+# How often (in writes) the disk tier is trimmed back to its size cap
+DISK_PRUNE_EVERY = 100
+
+
+class ResponseCache:
+    """
+    Content-addressed cache for deterministic LLM calls.
+    Keys are SHA256 over (model, messages, params). Lookups go through an
+    in-process LRU first, then a JSON-file tier under storage_data/llm_cache
+    shared by every worker process. Both tiers honour the TTL.
+    """
+    def __init__(self, ttl_seconds: int, memory_entries: int, disk_entries: int, storage: LocalDiskStorage | None = None):
+        storage = storage or LocalDiskStorage()
+        self.dir = os.path.join(storage.base_path, "llm_cache")
+        self.ttl_seconds = ttl_seconds
+        self.memory_entries = memory_entries
+        self.disk_entries = disk_entries
+        self._memory: OrderedDict[str, tuple[float, dict]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._writes = 0
+
+    def key(self, model: str, messages: list[dict], params: dict) -> str:
+        body = json.dumps({"model": model, "messages": messages, "params": params}, sort_keys=True)
+        return hashlib.sha256(body.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.dir, key[:2], f"{key}.json")
+
+    def get(self, key: str) -> dict | None:
+        now = time.time()
+        with self._lock:
+            hit = self._memory.get(key)
+            if hit:
+                expires_at, value = hit
+                if expires_at > now:
+                    self._memory.move_to_end(key)
+                    return value
+                del self._memory[key]
+
+        path = self._path(key)
+        try:
+            with open(path, "r") as f:
+                record = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+        if record["expires_at"] <= now:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            return None
+
+        self._remember(key, record["expires_at"], record["value"])
+        return record["value"]
+
+    def put(self, key: str, value: dict) -> None:
+        expires_at = time.time() + self.ttl_seconds
+        self._remember(key, expires_at, value)
+
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"expires_at": expires_at, "value": value}, f)
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            self._writes += 1
+            prune = self._writes % DISK_PRUNE_EVERY == 0
+        if prune:
+            self.prune_disk()
+
+    def _remember(self, key: str, expires_at: float, value: dict) -> None:
+        with self._lock:
+            self._memory[key] = (expires_at, value)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_entries:
+                self._memory.popitem(last=False)
+
+    def prune_disk(self) -> None:
+        """
+        Removes expired files and then the oldest ones beyond the disk size cap.
+        """
+        if not os.path.isdir(self.dir):
+            return
+        now = time.time()
+        files = []
+        for shard in os.scandir(self.dir):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                if entry.name.endswith(".json"):
+                    files.append((entry.stat().st_mtime, entry.path))
+
+        files.sort()
+        excess = len(files) - self.disk_entries
+        for i, (mtime, path) in enumerate(files):
+            if i >= excess and mtime + self.ttl_seconds > now:
+                continue
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+
+response_cache = ResponseCache(
+    ttl_seconds=settings.LLM_CACHE_TTL_SECONDS,
+    memory_entries=settings.LLM_CACHE_MEMORY_ENTRIES,
+    disk_entries=settings.LLM_CACHE_DISK_ENTRIES
+)
+
+
+def cached_chat_completion(client, model: str, messages: list[dict], **params) -> tuple[dict, bool]:
+    """
+    Calls client.chat.completions.create unless an identical deterministic
+    request (temperature 0) was answered before. Returns (result, cache_hit),
+    where result holds the answer, model and usage.
+    """
+    cacheable = settings.LLM_CACHE_ENABLED and params.get("temperature", 1.0) == 0
+    key = response_cache.key(model, messages, params) if cacheable else None
+    if key:
+        cached = response_cache.get(key)
+        if cached is not None:
+            return cached, True
+
+    response = client.chat.completions.create(model=model, messages=messages, **params)
+    result = {
+        "answer": response.choices[0].message.content,
+        "model": response.model,
+        "usage": {
+            "prompt_tokens": response.usage.prompt_tokens,
+            "completion_tokens": response.usage.completion_tokens
+        }
+    }
+    if key:
+        response_cache.put(key, result)
+    return result, False
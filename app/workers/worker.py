@@ -5,7 +5,9 @@ import os
 sys.path.append(os.getcwd())
 
 from sqlalchemy.orm import Session
+from app.core.config import settings
 from app.core.database import SessionLocal
+from app.core.job_notifier import get_job_notifier
 from app.repositories.job_repository import JobRepository
 from app.workers.dispatcher import dispatch_job
 
@@ -13,6 +15,8 @@ POLL_INTERVAL=2
 
 def run_worker():
     print("Worker started")
+    #Listen before the first claim so no job created in between is missed
+    get_job_notifier().listen()
 
     while True:
 
@@ -21,28 +25,29 @@ def run_worker():
         try:
             job_repo=JobRepository(db)
 
-            jobs=job_repo.get_next_pending(limit=1)
+            #Claim and mark RUNNING in one statement, so parallel workers never share a job
+            #One at a time: jobs run sequentially here, so claiming more would only hoard them
+            jobs=job_repo.claim_next(limit=1)
 
             if not jobs:
-                time.sleep(POLL_INTERVAL)
+                #Sleep until a job is created; polling is only the fallback
+                get_job_notifier().wait(settings.WORKER_POLL_INTERVAL)
                 continue
 
-            job= jobs[0]
-            print(f"Processing job {job.id} for target {job.job_type}")
+            job=jobs[0]
+            job_id=job.id
+            print(f"Processing job {job_id} for target {job.job_type}")
 
-            #Mark job as running
-            job_repo.mark_running(job)
-
-            #Dispatch job
+            #Dispatch job, then record its outcome right away
             try:
                 dispatch_job(job,db)
-
-                #Mark success
-                job_repo.mark_success(job)
-                print(f"Job {job.id} completed successfully")
             except Exception as e:
-                print(f"Job {job.id} failed: {e}")
-                job_repo.mark_failed(job,str(e))
+                print(f"Job {job_id} failed: {e}")
+                db.rollback()
+                job_repo.record_results([],{job_id:str(e)})
+            else:
+                job_repo.record_results([job_id],{})
+                print(f"Job {job_id} completed successfully")
         except Exception as e:
             print(f"Error processing job: {e}")
             time.sleep(POLL_INTERVAL)
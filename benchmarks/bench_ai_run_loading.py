@@ -0,0 +1,125 @@
+"""
+Counts database round-trips needed to load documents, latest versions and
+chunk references for an AI run: the old per-document loop versus the
+set-based repository methods.
+
+Usage (from the repo root):
+    python benchmarks/bench_ai_run_loading.py
+"""
+import os
+import sys
+import tempfile
+import uuid
+
+sys.path.append(os.getcwd())
+_db_file = os.path.join(tempfile.mkdtemp(), "bench.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{_db_file}"
+
+from sqlalchemy import event
+from app.core.database import Base, SessionLocal, engine
+from app.models import Document, DocumentChunk, DocumentVersion, Project, User, Workspace
+from app.repositories.document_chunk_repository import DocumentChunkRepository
+from app.repositories.document_repository import DocumentRepository
+from app.repositories.document_version_repository import DocumentVersionRepository
+
+CHUNKS_PER_VERSION = 20
+VERSIONS_PER_DOCUMENT = 2
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+        event.listen(engine, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, *args):
+        self.count += 1
+
+
+def seed(db, n_documents: int):
+    user = User(email=f"{uuid.uuid4()}@bench.local", hashed_password="x")
+    db.add(user)
+    db.flush()
+    workspace = Workspace(name="bench", created_by=user.id)
+    db.add(workspace)
+    db.flush()
+    project = Project(name="bench", workspace_id=workspace.id, created_by=user.id)
+    db.add(project)
+    db.flush()
+
+    document_ids = []
+    for d in range(n_documents):
+        document = Document(project_id=project.id, title=f"doc-{d}", created_by=user.id)
+        db.add(document)
+        db.flush()
+        document_ids.append(document.id)
+        for v in range(1, VERSIONS_PER_DOCUMENT + 1):
+            version = DocumentVersion(
+                document_id=document.id,
+                version_number=v,
+                file_path=f"documents/{project.id}/doc-{d}",
+                content_hash=uuid.uuid4().hex,
+                created_by=user.id
+            )
+            db.add(version)
+            db.flush()
+            db.add_all([
+                DocumentChunk(
+                    document_version_id=version.id,
+                    chunk_index=i,
+                    text=f"chunk {i} of doc {d} v{v}",
+                    content_hash=uuid.uuid4().hex,
+                    token_count=8
+                )
+                for i in range(CHUNKS_PER_VERSION)
+            ])
+    db.commit()
+    return project.id, document_ids
+
+
+def load_per_document(db, project_id, document_ids) -> int:
+    doc_repo = DocumentRepository(db)
+    version_repo = DocumentVersionRepository(db)
+    chunk_repo = DocumentChunkRepository(db)
+    loaded = 0
+    for doc_id in document_ids:
+        document = doc_repo.get_by_id(doc_id)
+        assert document.project_id == project_id
+        version = version_repo.get_latest(doc_id)
+        loaded += len(chunk_repo.list_by_version(version.id))
+    return loaded
+
+
+def load_set_based(db, project_id, document_ids) -> int:
+    version_repo = DocumentVersionRepository(db)
+    chunk_repo = DocumentChunkRepository(db)
+    rows = version_repo.get_latest_for_documents(project_id, document_ids)
+    assert len(rows) == len(document_ids)
+    return sum(1 for _ in chunk_repo.stream_refs_by_versions([v.id for _, v in rows]))
+
+
+def main():
+    Base.metadata.create_all(engine)
+    counter = QueryCounter()
+
+    print(f"{'documents':>10} {'per-document':>14} {'set-based':>10} {'chunks':>8}")
+    for n in (1, 50, 500):
+        db = SessionLocal()
+        project_id, document_ids = seed(db, n)
+        db.expunge_all()
+
+        counter.count = 0
+        expected = load_per_document(db, project_id, document_ids)
+        per_document = counter.count
+        db.expunge_all()
+
+        counter.count = 0
+        loaded = load_set_based(db, project_id, document_ids)
+        set_based = counter.count
+        assert loaded == expected
+
+        print(f"{n:>10} {per_document:>14} {set_based:>10} {loaded:>8}")
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Chunk write throughput: ORM add_all + flush versus the bulk_insert path
+(executemany INSERT on SQLite, COPY on PostgreSQL).
+
+Usage (from the repo root):
+    python benchmarks/bench_chunk_insert.py [--chunks 100000]
+
+Runs against a temporary SQLite file unless DATABASE_URL is set.
+"""
+import argparse
+import hashlib
+import os
+import sys
+import tempfile
+import time
+import uuid
+
+sys.path.append(os.getcwd())
+if "DATABASE_URL" not in os.environ:
+    _db_file = os.path.join(tempfile.mkdtemp(), "bench.db")
+    os.environ["DATABASE_URL"] = f"sqlite:///{_db_file}"
+
+from app.core.config import settings
+from app.core.database import Base, SessionLocal, engine
+from app.models import Document, DocumentChunk, DocumentVersion, Project, User, Workspace
+from app.repositories.document_chunk_repository import DocumentChunkRepository
+
+TEXT = "Bearing replacement schedule for turbine part XR-2231, see section 4. " * 14
+
+
+def seed_version(db):
+    user = User(email=f"{uuid.uuid4()}@bench.local", hashed_password="x")
+    db.add(user)
+    db.flush()
+    workspace = Workspace(name="bench", created_by=user.id)
+    db.add(workspace)
+    db.flush()
+    project = Project(name="bench", workspace_id=workspace.id, created_by=user.id)
+    db.add(project)
+    db.flush()
+    document = Document(project_id=project.id, title="bench", created_by=user.id)
+    db.add(document)
+    db.flush()
+    version = DocumentVersion(
+        document_id=document.id,
+        version_number=1,
+        file_path="documents/bench",
+        content_hash=uuid.uuid4().hex,
+        created_by=user.id
+    )
+    db.add(version)
+    db.commit()
+    return version.id
+
+
+def rows_for(version_id, n: int):
+    content_hash = hashlib.sha256(TEXT.encode("utf-8")).hexdigest()
+    return [
+        {
+            "id": uuid.uuid4(),
+            "document_version_id": version_id,
+            "chunk_index": i,
+            "text": TEXT,
+            "content_hash": content_hash,
+            "token_count": 250
+        }
+        for i in range(n)
+    ]
+
+
+def write_orm(db, rows):
+    repo = DocumentChunkRepository(db)
+    for start in range(0, len(rows), settings.INGEST_BATCH_SIZE):
+        chunks = [DocumentChunk(**row) for row in rows[start:start + settings.INGEST_BATCH_SIZE]]
+        repo.bulk_create(chunks)
+        for chunk in chunks:
+            db.expunge(chunk)
+
+
+def write_bulk(db, rows):
+    repo = DocumentChunkRepository(db)
+    for start in range(0, len(rows), settings.INGEST_BATCH_SIZE):
+        repo.bulk_insert(rows[start:start + settings.INGEST_BATCH_SIZE])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chunks", type=int, default=100000)
+    args = parser.parse_args()
+
+    Base.metadata.create_all(engine)
+    print(f"{engine.dialect.name}/{engine.dialect.driver}, {args.chunks} chunks, batches of {settings.INGEST_BATCH_SIZE}")
+
+    for name, write in (("orm add_all", write_orm), ("bulk_insert", write_bulk)):
+        db = SessionLocal()
+        version_id = seed_version(db)
+        rows = rows_for(version_id, args.chunks)
+
+        start = time.perf_counter()
+        write(db, rows)
+        db.commit()
+        elapsed = time.perf_counter() - start
+
+        print(f"{name:>12} {elapsed:>8.2f}s {args.chunks / elapsed:>12,.0f} chunks/s")
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Chunking throughput on a large synthetic corpus.
+
+Streams generated paragraphs through Chunker in 1 MB blocks and reports
+chunks/sec and MB/sec next to the old fixed 500-character slicing.
+
+Usage (from the repo root):
+    python benchmarks/bench_chunker.py [--mb 100]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.getcwd())
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from app.ingest.chunker import Chunker
+
+BLOCK_SIZE = 1024 * 1024
+WORDS = (
+    "retrieval index chunk version document project worker embedding token budget "
+    "latency throughput sentence paragraph boundary overlap storage segment query"
+).split()
+
+
+def synthetic_corpus(megabytes: int) -> list[str]:
+    rng = random.Random(3)
+    parts, size = [], 0
+    while size < megabytes * 1024 * 1024:
+        sentences = [
+            " ".join(rng.choice(WORDS) for _ in range(rng.randint(6, 30))).capitalize() + rng.choice(".!?")
+            for _ in range(rng.randint(2, 12))
+        ]
+        heading = f"# Section {len(parts)}\n" if rng.random() < 0.05 else ""
+        paragraph = heading + " ".join(sentences) + "\n\n"
+        parts.append(paragraph)
+        size += len(paragraph)
+    text = "".join(parts)
+    return [text[i:i + BLOCK_SIZE] for i in range(0, len(text), BLOCK_SIZE)]
+
+
+def fixed_slices(blocks: list[str], size: int = 500):
+    pending = ""
+    for block in blocks:
+        pending += block
+        start = 0
+        while len(pending) - start >= size:
+            yield pending[start:start + size]
+            start += size
+        pending = pending[start:]
+    if pending:
+        yield pending
+
+
+def measure(name: str, chunks, total_bytes: int):
+    start = time.perf_counter()
+    count = sum(1 for _ in chunks)
+    elapsed = time.perf_counter() - start
+    print(
+        f"{name:>14} {count:>10} chunks {elapsed:>7.2f}s "
+        f"{count / elapsed:>12,.0f} chunks/s {total_bytes / elapsed / 2**20:>8.1f} MB/s"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--mb", type=int, default=100)
+    args = parser.parse_args()
+
+    blocks = synthetic_corpus(args.mb)
+    total_bytes = sum(len(b) for b in blocks)
+    print(f"corpus: {total_bytes / 2**20:.1f} MB in {len(blocks)} blocks")
+
+    measure("fixed-500", fixed_slices(blocks), total_bytes)
+    measure("chunker", Chunker().chunks(blocks), total_bytes)
+    measure("chunker-128", Chunker(max_tokens=128, overlap_tokens=16).chunks(blocks), total_bytes)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""
+Queue wait of small tenants while one project runs a bulk ingest, with the
+fair claim_next versus plain oldest-first claiming.
+
+One "bulk" project queues many DOCUMENT_INGEST jobs first; a few other
+projects then queue a handful of AI_RUN and DOCUMENT_INGEST jobs. A worker
+with --slots concurrent slots is simulated on a virtual clock (ingests take
+--ingest-s, AI runs --run-s), so the numbers show scheduling, not speed.
+
+Usage (from the repo root):
+    python benchmarks/bench_fair_scheduling.py [--bulk 2000] [--tenants 5] [--slots 4]
+
+Runs against a temporary SQLite file unless DATABASE_URL is set.
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import uuid
+from datetime import datetime, timedelta, timezone
+
+sys.path.append(os.getcwd())
+if "DATABASE_URL" not in os.environ:
+    _db_file = os.path.join(tempfile.mkdtemp(), "fair.db")
+    os.environ["DATABASE_URL"] = f"sqlite:///{_db_file}"
+
+from sqlalchemy import select, update
+from sqlalchemy.sql import func
+
+from app.core.config import settings
+from app.core.database import Base, SessionLocal, engine
+from app.models import Job, Project, User, Workspace
+from app.repositories.job_repository import JobRepository
+
+
+def seed(db, n_bulk: int, n_tenants: int) -> tuple:
+    db.query(Job).delete()
+    user = User(email=f"{uuid.uuid4()}@bench.local", hashed_password="x")
+    db.add(user)
+    db.flush()
+    workspace = Workspace(name="fair", created_by=user.id)
+    db.add(workspace)
+    db.flush()
+    projects = [Project(name=f"p{i}", workspace_id=workspace.id, created_by=user.id) for i in range(n_tenants + 1)]
+    db.add_all(projects)
+    db.flush()
+
+    # Explicit, strictly increasing created_at so "oldest first" is well defined
+    created = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    jobs = []
+
+    def add(project, job_type):
+        jobs.append(Job(
+            project_id=project.id, job_type=job_type, target_type="NONE", target_id=uuid.uuid4(),
+            priority=settings.JOB_PRIORITIES.get(job_type, 10),
+            created_at=created + timedelta(microseconds=len(jobs))
+        ))
+
+    bulk, tenants = projects[0], projects[1:]
+    for _ in range(n_bulk):
+        add(bulk, "DOCUMENT_INGEST")
+    for project in tenants:
+        for _ in range(3):
+            add(project, "DOCUMENT_INGEST")
+        for _ in range(10):
+            add(project, "AI_RUN")
+    db.add_all(jobs)
+    db.commit()
+    return bulk.id
+
+
+def claim_fifo(db, limit: int) -> list[Job]:
+    candidates = select(Job.id).where(Job.status == "PENDING").order_by(Job.created_at.asc()).limit(limit)
+    claimed = db.scalars(
+        update(Job)
+        .where(Job.id.in_(candidates.scalar_subquery()))
+        .values(status="RUNNING", started_at=func.now())
+        .returning(Job)
+        .execution_options(synchronize_session=False)
+    ).all()
+    db.commit()
+    return claimed
+
+
+def simulate(fair: bool, args) -> dict:
+    db = SessionLocal()
+    repo = JobRepository(db)
+    bulk_id = seed(db, args.bulk, args.tenants)
+    duration = {"AI_RUN": args.run_s, "DOCUMENT_INGEST": args.ingest_s}
+
+    clock = 0.0
+    running: list[tuple[float, uuid.UUID]] = []
+    waits: dict[str, list[float]] = {"AI_RUN": [], "tenant ingest": []}
+    while True:
+        free = args.slots - len(running)
+        if free:
+            jobs = repo.claim_next(limit=free) if fair else claim_fifo(db, free)
+            for job in jobs:
+                running.append((clock + duration[job.job_type], job.id))
+                if job.job_type == "AI_RUN":
+                    waits["AI_RUN"].append(clock)
+                elif job.project_id != bulk_id:
+                    waits["tenant ingest"].append(clock)
+        if not running:
+            break
+        # Advance to the next completion and record every job finishing then
+        clock = min(finish for finish, _ in running)
+        done = [job_id for finish, job_id in running if finish == clock]
+        running = [(finish, job_id) for finish, job_id in running if finish != clock]
+        repo.record_results(done, {})
+
+    db.close()
+    return {"waits": waits, "makespan": clock}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--bulk", type=int, default=2000)
+    parser.add_argument("--tenants", type=int, default=5)
+    parser.add_argument("--slots", type=int, default=4)
+    parser.add_argument("--ingest-s", type=float, default=1.0)
+    parser.add_argument("--run-s", type=float, default=0.1)
+    args = parser.parse_args()
+
+    Base.metadata.create_all(engine)
+    print(f"{'scheduler':>10} {'kind':>14} {'mean wait':>10} {'max wait':>10} {'makespan':>9}")
+    for name, fair in (("fifo", False), ("fair", True)):
+        result = simulate(fair, args)
+        for kind, waits in result["waits"].items():
+            print(f"{name:>10} {kind:>14} {statistics.mean(waits):>9.1f}s {max(waits):>9.1f}s {result['makespan']:>8.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+End-to-end ingest throughput of IngestPipeline for different pool sizes,
+with the per-stage busy times it reports.
+
+Usage (from the repo root):
+    python benchmarks/bench_ingest_pipeline.py [--mb 50] [--workers 1 2 4 8]
+
+Uses a temporary SQLite database and storage directory.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import uuid
+
+sys.path.append(os.getcwd())
+_tmp = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmp, 'bench.db')}"
+
+from app.core.config import settings
+from app.core.database import Base, SessionLocal, engine
+from app.ingest.pipeline import IngestPipeline
+from app.models import Document, DocumentVersion, Project, User, Workspace
+from app.storage.local import LocalDiskStorage
+
+WORDS = (
+    "retrieval index chunk version document project worker embedding token budget "
+    "latency throughput sentence paragraph boundary overlap storage segment query"
+).split()
+
+
+def synthetic_text(megabytes: int) -> str:
+    rng = random.Random(7)
+    parts, size = [], 0
+    while size < megabytes * 1024 * 1024:
+        paragraph = " ".join(
+            " ".join(rng.choice(WORDS) for _ in range(rng.randint(6, 30))).capitalize() + "."
+            for _ in range(rng.randint(2, 12))
+        ) + "\n\n"
+        parts.append(paragraph)
+        size += len(paragraph)
+    return "".join(parts)
+
+
+def seed_versions(db, file_path: str, count: int) -> tuple:
+    user = User(email=f"{uuid.uuid4()}@bench.local", hashed_password="x")
+    db.add(user)
+    db.flush()
+    workspace = Workspace(name="bench", created_by=user.id)
+    db.add(workspace)
+    db.flush()
+    project = Project(name="bench", workspace_id=workspace.id, created_by=user.id)
+    db.add(project)
+    db.flush()
+    versions = []
+    for i in range(count):
+        document = Document(project_id=project.id, title=f"bench-{i}", created_by=user.id)
+        db.add(document)
+        db.flush()
+        version = DocumentVersion(
+            document_id=document.id,
+            version_number=1,
+            file_path=file_path,
+            content_hash=uuid.uuid4().hex,
+            created_by=user.id
+        )
+        db.add(version)
+        versions.append(version)
+    db.commit()
+    return project.id, versions
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--mb", type=int, default=50)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    args = parser.parse_args()
+
+    Base.metadata.create_all(engine)
+    storage = LocalDiskStorage(base_path=os.path.join(_tmp, "storage"))
+    storage.save("bench/input.txt", synthetic_text(args.mb).encode("utf-8"))
+
+    db = SessionLocal()
+    project_id, versions = seed_versions(db, "bench/input.txt", len(args.workers))
+    print(f"{args.mb} MB input, {os.cpu_count()} cores")
+
+    import app.ingest.pipeline as pipeline
+    for workers, version in zip(args.workers, versions):
+        # Fresh pool of the requested size for each run
+        if pipeline._pool is not None:
+            pipeline._pool.shutdown()
+            pipeline._pool = None
+        settings.INGEST_WORKERS = workers
+
+        result = IngestPipeline(db, storage, project_id).run(version, None)
+        db.commit()
+        mb_per_second = result.bytes_read / result.elapsed / (1024 * 1024)
+        print(f"workers={workers:<3} {result.chunk_count} chunks {result.elapsed:>7.2f}s {mb_per_second:>7.2f} MB/s")
+        for stage, times in result.stages.items():
+            print(f"    {stage:<6} {times['seconds']:>8.2f}s busy {times['items']:>8} items")
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Recall-vs-memory report for vector segment storage modes.
+
+Builds segments from a project's existing vectors (or synthetic clustered
+data) in float32 and int8 mode, then compares top-k recall against exact
+search alongside the bytes the candidate scan has to touch.
+
+Usage (from the repo root):
+    python benchmarks/bench_vector_quantization.py [--project-id UUID] [--rows N] [--top-k K]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import uuid
+
+sys.path.append(os.getcwd())
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+import numpy as np
+from app.core.config import settings
+from app.retrieval.vector_index import VectorIndex, VectorSegment, write_segment
+
+
+def load_project_vectors(project_id: str) -> np.ndarray:
+    index = VectorIndex(uuid.UUID(project_id))
+    manifest = index._load_manifest()
+    names = [n for segments in manifest["versions"].values() for n in segments]
+    if not names:
+        raise SystemExit(f"No vector segments found for project {project_id}")
+    segments = [index._segment(n) for n in dict.fromkeys(names)]
+    return np.vstack([segment.dense(np.arange(segment.count)) for segment in segments])
+
+
+def synthetic_vectors(rows: int, dim: int) -> np.ndarray:
+    rng = np.random.default_rng(7)
+    centers = rng.normal(size=(max(8, rows // 500), dim))
+    vectors = centers[rng.integers(0, len(centers), rows)] + 0.4 * rng.normal(size=(rows, dim))
+    return (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).astype(np.float32)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--project-id")
+    parser.add_argument("--rows", type=int, default=50000)
+    parser.add_argument("--dim", type=int, default=settings.EMBEDDING_DIM)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--top-k", type=int, default=10)
+    args = parser.parse_args()
+
+    vectors = load_project_vectors(args.project_id) if args.project_id else synthetic_vectors(args.rows, args.dim)
+    rows, dim = vectors.shape
+    rng = np.random.default_rng(11)
+    queries = vectors[rng.integers(0, rows, args.queries)] + 0.05 * rng.normal(size=(args.queries, dim))
+    queries = (queries / np.linalg.norm(queries, axis=1, keepdims=True)).astype(np.float32)
+    exact = [set(np.argsort(-(vectors @ q))[:args.top_k]) for q in queries]
+
+    chunk_ids = [uuid.UUID(int=i) for i in range(rows)]
+    workdir = tempfile.mkdtemp()
+    print(f"{rows} vectors x {dim} dims, top-{args.top_k}, nprobe={settings.VECTOR_NPROBE}")
+    print(f"{'mode':>6} {'rescore':>8} {'recall':>8} {'scan MB':>9} {'file MB':>9} {'ms/query':>9}")
+
+    for mode, factors in (("none", [1]), ("int8", [1, 2, 4, 8])):
+        path = os.path.join(workdir, f"{mode}.vseg")
+        write_segment(path, [str(uuid.uuid4())] * rows, chunk_ids, vectors, quantization=mode)
+        segment = VectorSegment(path)
+        scan_bytes = segment.codes.nbytes if mode == "int8" else segment.vectors.nbytes
+        file_bytes = os.path.getsize(path)
+
+        for factor in factors:
+            hits, start = 0, time.perf_counter()
+            for q, truth in zip(queries, exact):
+                found = segment.search(q, args.top_k, settings.VECTOR_NPROBE, factor)
+                hits += len(truth & {c.int for c, _ in found})
+            elapsed = (time.perf_counter() - start) * 1000 / len(queries)
+            recall = hits / (len(queries) * args.top_k)
+            print(
+                f"{mode:>6} {factor:>8} {recall:>8.3f} {scan_bytes / 2**20:>9.1f} "
+                f"{file_bytes / 2**20:>9.1f} {elapsed:>9.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
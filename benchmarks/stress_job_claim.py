@@ -0,0 +1,102 @@
+"""
+Multi-worker stress test for JobRepository.claim_next: several processes
+claim from one queue concurrently and every job must be claimed exactly once.
+Also reports throughput per worker count with a simulated job duration.
+With --batch N each worker claims N jobs at a time and records their
+outcomes with one record_results call; --job-ms 0 isolates the DB overhead.
+
+Usage (from the repo root):
+    python benchmarks/stress_job_claim.py [--jobs 2000] [--workers 1 2 4 8] [--job-ms 5] [--batch 1]
+
+Runs against a temporary SQLite file unless DATABASE_URL is set
+(point it at PostgreSQL to exercise FOR UPDATE SKIP LOCKED).
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+import uuid
+from collections import Counter
+
+sys.path.append(os.getcwd())
+if "DATABASE_URL" not in os.environ:
+    _db_file = os.path.join(tempfile.mkdtemp(), "stress.db")
+    os.environ["DATABASE_URL"] = f"sqlite:///{_db_file}"
+
+
+def seed(n_jobs: int):
+    from app.core.database import Base, SessionLocal, engine
+    from app.models import Job, Project, User, Workspace
+
+    Base.metadata.create_all(engine)
+    db = SessionLocal()
+    db.query(Job).delete()
+    user = User(email=f"{uuid.uuid4()}@bench.local", hashed_password="x")
+    db.add(user)
+    db.flush()
+    workspace = Workspace(name="stress", created_by=user.id)
+    db.add(workspace)
+    db.flush()
+    project = Project(name="stress", workspace_id=workspace.id, created_by=user.id)
+    db.add(project)
+    db.flush()
+    db.add_all([
+        Job(project_id=project.id, job_type="STRESS", target_type="NONE", target_id=uuid.uuid4())
+        for _ in range(n_jobs)
+    ])
+    db.commit()
+    db.close()
+
+
+def worker(job_seconds: float, batch: int) -> list[str]:
+    from app.core.database import SessionLocal
+    from app.repositories.job_repository import JobRepository
+
+    claimed = []
+    db = SessionLocal()
+    repo = JobRepository(db)
+    while True:
+        jobs = repo.claim_next(limit=batch)
+        if not jobs:
+            break
+        if batch == 1:
+            claimed.append(str(jobs[0].id))
+            time.sleep(job_seconds)
+            repo.mark_success(jobs[0])
+            continue
+        job_ids = [job.id for job in jobs]
+        for job_id in job_ids:
+            claimed.append(str(job_id))
+            time.sleep(job_seconds)
+        repo.record_results(job_ids, {})
+    db.close()
+    return claimed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--jobs", type=int, default=2000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--job-ms", type=float, default=5.0)
+    parser.add_argument("--batch", type=int, default=1)
+    args = parser.parse_args()
+
+    print(f"{'workers':>8} {'jobs':>6} {'seconds':>8} {'jobs/s':>8} {'duplicates':>11}")
+    for n_workers in args.workers:
+        seed(args.jobs)
+        started = time.perf_counter()
+        with multiprocessing.get_context("spawn").Pool(n_workers) as pool:
+            results = pool.starmap(worker, [(args.job_ms / 1000, args.batch)] * n_workers)
+        elapsed = time.perf_counter() - started
+
+        counts = Counter(job_id for claimed in results for job_id in claimed)
+        duplicates = sum(1 for c in counts.values() if c > 1)
+        print(f"{n_workers:>8} {len(counts):>6} {elapsed:>8.2f} {len(counts) / elapsed:>8.0f} {duplicates:>11}")
+        assert duplicates == 0, "a job was claimed by more than one worker"
+        assert len(counts) == args.jobs, "some jobs were never claimed"
+
+
+if __name__ == "__main__":
+    main()
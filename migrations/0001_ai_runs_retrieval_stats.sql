@@ -0,0 +1,2 @@
+-- Per-run retrieval timings and candidate counts (hybrid retrieval)
+ALTER TABLE ai_runs ADD COLUMN IF NOT EXISTS retrieval_stats JSON;
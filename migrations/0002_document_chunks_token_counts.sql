@@ -0,0 +1,4 @@
+-- Precomputed token estimate and chunker overlap, used for context packing.
+-- Both stay empty for chunks written before them.
+ALTER TABLE document_chunks ADD COLUMN IF NOT EXISTS token_count INTEGER;
+ALTER TABLE document_chunks ADD COLUMN IF NOT EXISTS overlap_chars INTEGER;
@@ -0,0 +1,3 @@
+-- SHA256 of the chunk text; AI runs snapshot chunk references instead of text.
+-- Chunks written before it have no hash and are read by text.
+ALTER TABLE document_chunks ADD COLUMN IF NOT EXISTS content_hash VARCHAR(64);
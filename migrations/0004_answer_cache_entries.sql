@@ -0,0 +1,19 @@
+-- Semantic answer cache (app/models/answer_cache_entry.py)
+CREATE TABLE IF NOT EXISTS answer_cache_entries (
+    id UUID NOT NULL,
+    project_id UUID NOT NULL,
+    version_key VARCHAR(64) NOT NULL,
+    document_ids JSON NOT NULL,
+    question TEXT NOT NULL,
+    question_embedding BYTEA NOT NULL,
+    output_payload JSON NOT NULL,
+    source_run_id UUID,
+    hit_count INTEGER NOT NULL,
+    last_used_at TIMESTAMP WITH TIME ZONE DEFAULT now(),
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT now(),
+    PRIMARY KEY (id),
+    FOREIGN KEY (project_id) REFERENCES projects (id),
+    FOREIGN KEY (source_run_id) REFERENCES ai_runs (id)
+);
+
+CREATE INDEX IF NOT EXISTS ix_answer_cache_entries_version_key ON answer_cache_entries (version_key);
@@ -0,0 +1,2 @@
+-- Lets a new document version find the unchanged chunks of the previous one
+CREATE INDEX IF NOT EXISTS ix_document_chunks_content_hash ON document_chunks (content_hash);
@@ -0,0 +1,3 @@
+-- Upload dedup looks versions up by file hash, then checks their ingest jobs
+CREATE INDEX IF NOT EXISTS ix_document_versions_content_hash ON document_versions (content_hash);
+CREATE INDEX IF NOT EXISTS ix_jobs_target_id_job_type ON jobs (target_id, job_type);
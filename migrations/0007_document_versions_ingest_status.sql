@@ -0,0 +1,4 @@
+-- PENDING until the ingest commits the version's chunks (READY) or gives up (FAILED).
+-- Versions that exist already were ingested under the old flow, so they start READY.
+ALTER TABLE document_versions ADD COLUMN IF NOT EXISTS ingest_status VARCHAR NOT NULL DEFAULT 'READY';
+ALTER TABLE document_versions ALTER COLUMN ingest_status SET DEFAULT 'PENDING';
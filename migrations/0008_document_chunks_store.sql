@@ -0,0 +1,4 @@
+-- Optional chunk store: text moves to compressed segment files and the row keeps its location
+ALTER TABLE document_chunks ALTER COLUMN text DROP NOT NULL;
+ALTER TABLE document_chunks ADD COLUMN IF NOT EXISTS store_segment VARCHAR;
+ALTER TABLE document_chunks ADD COLUMN IF NOT EXISTS store_slot INTEGER;
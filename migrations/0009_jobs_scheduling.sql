@@ -0,0 +1,16 @@
+-- Priority classes and per-project queues for claim_next.
+-- Existing jobs get the priority of their type from JOB_PRIORITIES.
+ALTER TABLE jobs ADD COLUMN IF NOT EXISTS priority INTEGER;
+UPDATE jobs SET priority = CASE job_type
+    WHEN 'AI_RUN' THEN 0
+    WHEN 'DOCUMENT_INGEST' THEN 10
+    WHEN 'DOCUMENT_INGEST_BATCH' THEN 20
+    ELSE 10
+END
+WHERE priority IS NULL;
+ALTER TABLE jobs ALTER COLUMN priority SET DEFAULT 10;
+ALTER TABLE jobs ALTER COLUMN priority SET NOT NULL;
+
+CREATE INDEX IF NOT EXISTS ix_jobs_status_priority_created_at ON jobs (status, priority, created_at);
+CREATE INDEX IF NOT EXISTS ix_jobs_status_project_id ON jobs (status, project_id);
+CREATE INDEX IF NOT EXISTS ix_jobs_status_type_project_queue ON jobs (status, job_type, project_id, priority, created_at);